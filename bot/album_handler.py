@@ -4,21 +4,52 @@ Handles Telegram media albums (grouped messages)
 
 import asyncio
 import logging
+from collections import OrderedDict
+from operator import attrgetter
 from typing import Dict, List, Optional, Callable, Awaitable
 from telethon.tl.types import Message
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of albums collected at the same time
+MAX_PENDING_ALBUMS = 1024
+
+# An album is processed once no new part arrived for ALBUM_QUIET_PERIOD
+# seconds, but never later than ALBUM_MAX_WAIT after its first part
+ALBUM_QUIET_PERIOD = 0.25
+ALBUM_MAX_WAIT = 2.0
+
+# Maximum number of album items processed concurrently
+MAX_ITEM_CONCURRENCY = 4
+
+_get_id = attrgetter('id')
+
 
 class AlbumHandler:
     """
     Collects grouped messages and processes them as a single album
     """
     
-    def __init__(self, process_callback: Callable[[List[Message]], Awaitable[None]]):
+    __slots__ = ('process_callback', 'process_item', 'item_semaphore', 'pending_albums', 'last_add')
+    
+    def __init__(
+        self,
+        process_callback: Callable[[List[Message]], Awaitable[None]],
+        process_item: Optional[Callable[[Message], Awaitable[None]]] = None
+    ):
+        """
+        Initialize album handler
+        
+        Args:
+            process_callback: Called with the whole album (sorted by id)
+            process_item: Optional per-message callback; when set, album items
+                are processed concurrently instead of via process_callback
+        """
         self.process_callback = process_callback
-        self.pending_albums: Dict[int, List[Message]] = {}
-        self.locks: Dict[int, asyncio.Lock] = {}
+        self.process_item = process_item
+        self.item_semaphore = asyncio.Semaphore(MAX_ITEM_CONCURRENCY)
+        self.pending_albums: "OrderedDict[int, List[Message]]" = OrderedDict()
+        self.last_add: Dict[int, float] = {}
         
     async def handle_message(self, message: Message) -> bool:
         """
@@ -32,37 +63,61 @@ class AlbumHandler:
             return False
             
         group_id = message.grouped_id
+        self.last_add[group_id] = asyncio.get_running_loop().time()
         
-        # Initialize group if new
+        # Initialize group if new (no awaits here, so no lock is needed)
         if group_id not in self.pending_albums:
-            self.pending_albums[group_id] = []
-            self.locks[group_id] = asyncio.Lock()
+            self.pending_albums[group_id] = [message]
+            
+            # Drop the oldest album if too many are pending
+            if len(self.pending_albums) > MAX_PENDING_ALBUMS:
+                evicted_id, _ = self.pending_albums.popitem(last=False)
+                self.last_add.pop(evicted_id, None)
+                logger.warning(f"Too many pending albums, dropped group {evicted_id}")
             
             # Schedule processing
             asyncio.create_task(self._schedule_processing(group_id))
-        
-        async with self.locks[group_id]:
+        else:
             self.pending_albums[group_id].append(message)
             
         return True
     
     async def _schedule_processing(self, group_id: int):
-        """Wait for more messages then process album"""
-        # Wait for other parts to arrive
-        await asyncio.sleep(2.0)
+        """Wait until the album is complete (debounced), then process it"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ALBUM_MAX_WAIT
         
-        messages = []
-        async with self.locks[group_id]:
-            if group_id in self.pending_albums:
-                messages = self.pending_albums.pop(group_id)
-                # cleanup lock
-                self.locks.pop(group_id, None)
+        try:
+            # Wait for other parts to arrive
+            while group_id in self.pending_albums:
+                now = loop.time()
+                last_add = self.last_add.get(group_id, now)
+                wake_at = min(last_add + ALBUM_QUIET_PERIOD, deadline)
+                if now >= wake_at:
+                    break
+                await asyncio.sleep(wake_at - now)
+        finally:
+            # Always release the group, even if cancelled or evicted
+            messages = self.pending_albums.pop(group_id, [])
+            self.last_add.pop(group_id, None)
         
         if messages:
-            # Sort by ID to ensure correct order
-            messages.sort(key=lambda m: m.id)
+            # Sort by ID to ensure correct order (parts usually arrive sorted)
+            if any(a.id > b.id for a, b in zip(messages, messages[1:])):
+                messages.sort(key=_get_id)
             logger.info(f"📚 Processing album with {len(messages)} messages (Group: {group_id})")
             
+            if self.process_item:
+                # Items are independent, so overlap their I/O
+                results = await asyncio.gather(
+                    *map(self._process_item, messages),
+                    return_exceptions=True
+                )
+                for message, result in zip(messages, results):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error processing album {group_id} item {message.id}: {result}")
+                return
+            
             try:
                 # Process the album
                 # We typically process the first message (with caption) 
@@ -70,3 +125,8 @@ class AlbumHandler:
                 await self.process_callback(messages)
             except Exception as e:
                 logger.error(f"Error processing album {group_id}: {e}")
+    
+    async def _process_item(self, message: Message) -> None:
+        """Run the per-item callback with bounded concurrency"""
+        async with self.item_semaphore:
+            await self.process_item(message)
@@ -18,12 +18,25 @@ from bot.processors import MessageProcessor
 from bot.rate_limiter import RateLimiter
 from bot.monitoring import Monitoring
 from bot.health import HealthCheckServer
-from bot.performance import get_performance_monitor, TimedOperation
 import bot.exceptions as be
 from bot.deduplication import Deduplicator
+from bot.utils import NormalizedText
 
 logger = logging.getLogger(__name__)
 
+# Connection settings shared by the userbot and the Bot API client. Outbound
+# sends are capped separately by RateLimiter (20/min, 100/hour), which keeps
+# each client's MTProto sender well below Telegram's flood limits.
+TELEGRAM_CLIENT_OPTIONS = {
+    'connection_retries': 5,
+    'request_retries': 5,
+    'flood_sleep_threshold': 60,
+    'timeout': 30,
+}
+
+# History messages processed ahead of the one being sent
+PROCESS_AHEAD = 8
+
 
 class NewsBot:
     """
@@ -50,19 +63,20 @@ class NewsBot:
         self.storage = storage
         self.monitoring = monitoring
         self.health_server = health_server
-        self.perf_monitor = get_performance_monitor()
         
         # Initialize services
         self.message_filter = MessageFilter(
             keywords=config.KEYWORDS,
-            spam_keywords=config.SPAM_KEYWORDS
+            spam_keywords=config.SPAM_KEYWORDS,
+            automaton=config.keyword_automaton
         )
         
         self.ai_service = AIService(api_key=config.GROQ_API_KEY)
         
         self.processor = MessageProcessor(
             message_filter=self.message_filter,
-            ai_service=self.ai_service
+            ai_service=self.ai_service,
+            monitoring=monitoring
         )
         
         # New deduplicator (85% similarity threshold)
@@ -88,7 +102,8 @@ class NewsBot:
         self.client = TelegramClient(
             session,
             config.API_ID,
-            config.API_HASH
+            config.API_HASH,
+            **TELEGRAM_CLIENT_OPTIONS
         )
         
         self.bot_client: Optional[TelegramClient] = None
@@ -189,7 +204,8 @@ class NewsBot:
             self.bot_client = TelegramClient(
                 'bot_session',
                 self.config.API_ID,
-                self.config.API_HASH
+                self.config.API_HASH,
+                **TELEGRAM_CLIENT_OPTIONS
             )
             await self.bot_client.start(bot_token=self.config.BOT_TOKEN)
             
@@ -197,12 +213,8 @@ class NewsBot:
             logger.info(f"✅ Bot API connected: @{bot_me.username}")
             
             # Setup review channel
-            if self.config.REVIEW_CHANNEL_ID:
-                rc_id = self.config.REVIEW_CHANNEL_ID
-                if rc_id.lstrip('-').isdigit():
-                    self.review_channel = int(rc_id)
-                else:
-                    self.review_channel = rc_id
+            if self.config.review_channel:
+                self.review_channel = self.config.review_channel
                 logger.info(f"👀 Review channel: {self.review_channel}")
             else:
                 me = await self.client.get_me()
@@ -225,13 +237,21 @@ class NewsBot:
             logger.error(f"❌ Cannot access target channel {self.config.TARGET_CHANNEL}: {e}")
             raise
         
-        # Validate source channels
-        for source in self.config.SOURCE_CHANNELS:
-            try:
-                await self.client.get_entity(source)
+        # Validate source channels concurrently
+        results = await asyncio.gather(
+            *(self.client.get_entity(source) for source in self.config.SOURCE_CHANNELS),
+            return_exceptions=True
+        )
+        source_names = []
+        for source, result in zip(self.config.SOURCE_CHANNELS, results):
+            if isinstance(result, Exception):
+                logger.warning(f"⚠️ Cannot access source channel {source}: {result}")
+            else:
                 self.valid_sources.append(source)
-            except Exception as e:
-                logger.warning(f"⚠️ Cannot access source channel {source}: {e}")
+                # Same name _handle_new_message derives from the chat
+                source_names.append(getattr(result, 'title', getattr(result, 'username', 'Unknown')))
+        
+        self.monitoring.register_sources(source_names)
         
         if not self.valid_sources:
             raise ValueError("No valid source channels available!")
@@ -242,86 +262,177 @@ class NewsBot:
         """Forward today's old messages (from midnight until now)"""
         logger.info("📅 Checking for today's old messages...")
         
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Telethon message dates are timezone-aware (UTC), so compare against
+        # an aware local midnight
+        today = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # Channels are scanned concurrently; sends are serialized so the
+        # daily limit check and the counter update stay consistent
+        send_lock = asyncio.Lock()
+        results = await asyncio.gather(
+            *(self._scan_today_messages(source, today, send_lock) for source in self.valid_sources)
+        )
+        
+        total_checked = sum(checked for checked, _ in results)
+        forwarded_count = sum(forwarded for _, forwarded in results)
+        
+        logger.info(f"📊 Total checked: {total_checked} messages")
+        if forwarded_count > 0:
+            logger.info(f"✅ Forwarded {forwarded_count} old messages from today")
+        else:
+            logger.info("ℹ️ No old messages to forward")
+    
+    async def _scan_today_messages(
+        self,
+        source: str,
+        today: datetime,
+        send_lock: asyncio.Lock
+    ) -> tuple:
+        """
+        Forward today's not yet forwarded messages from one source channel
+        
+        Args:
+            source: Source channel
+            today: Local midnight of the current day
+            send_lock: Lock shared by all channel scans around sending
+        
+        Returns:
+            Tuple of (messages checked, messages forwarded)
+        """
+        logger.info(f"  🔍 Checking {source}...")
+        channel_messages = 0
         forwarded_count = 0
-        total_checked = 0
         
-        for source in self.valid_sources:
-            logger.info(f"  🔍 Checking {source}...")
-            channel_messages = 0
+        try:
+            # All messages of a channel share one chat entity
+            chat = await self.client.get_entity(source)
+            source_name = getattr(chat, 'title', getattr(chat, 'username', 'Unknown'))
+            
+            # Pass 1: collect today's text messages (iterated newest first)
+            candidates = []
+            async for message in self.client.iter_messages(
+                source,
+                limit=100  # Check last 100 messages per channel
+            ):
+                channel_messages += 1
+                
+                # Everything after this is older than today
+                if message.date < today:
+                    break
+                
+                # Skip if no text
+                if not message.text:
+                    continue
+                
+                candidates.append((f"{message.chat_id}_{message.id}", message))
+            
+            # Forward in chronological order
+            candidates.reverse()
+            
+            # Pass 2: one query for the whole channel instead of one per message
+            already_forwarded = await self.storage.filter_forwarded_ids(
+                [msg_id for msg_id, _ in candidates]
+            )
+            
+            pending = [
+                (msg_id, message) for msg_id, message in candidates
+                if msg_id not in already_forwarded
+            ]
+            
+            # Processing stage: runs up to PROCESS_AHEAD messages ahead of
+            # sending, so AI calls overlap (and share batches) instead of
+            # each one waiting for the previous send
+            processed_queue = asyncio.Queue(maxsize=PROCESS_AHEAD)
+            producer = asyncio.create_task(
+                self._process_ahead(pending, source_name, processed_queue)
+            )
             
             try:
-                # Get messages from today
-                async for message in self.client.iter_messages(
-                    source,
-                    offset_date=datetime.now(),
-                    reverse=True,
-                    limit=100  # Check last 100 messages per channel
-                ):
-                    total_checked += 1
-                    channel_messages += 1
-                    
-                    # Check if message is from today
-                    if message.date < today:
-                        continue
-                    
-                    # Skip if no text
-                    if not message.text:
-                        continue
-                    
-                    # Check if already forwarded
-                    msg_id = f"{message.chat_id}_{message.id}"
-                    if await self.storage.is_message_forwarded(msg_id):
-                        continue
+                for _ in range(len(pending)):
+                    msg_id, task = await processed_queue.get()
                     
                     # Check daily limit
                     today_count = await self.storage.get_today_post_count()
                     if today_count >= self.config.MAX_POSTS_PER_DAY:
                         logger.info(f"⚠️ Daily limit reached ({self.config.MAX_POSTS_PER_DAY})")
-                        return
+                        task.cancel()
+                        break
                     
-                    # Process message
-                    chat = await message.get_chat()
-                    source_name = getattr(chat, 'title', getattr(chat, 'username', 'Unknown'))
-                    processed = await self.processor.process_message(message, source_name)
+                    # Processed ahead of time by the processing stage; a
+                    # failure skips only this message
+                    try:
+                        processed = await task
+                    except Exception as e:
+                        logger.error(f"Failed to process old message {msg_id}: {e}")
+                        continue
                     
                     if not processed:
                         continue
                     
-                    # Apply rate limiting
-                    await self.rate_limiter.acquire()
-                    
-                    # Send directly (no review for old messages)
-                    try:
-                        await self.client.send_message(
-                            self.config.TARGET_CHANNEL,
-                            processed['final_text']
-                        )
-                        
-                        # Mark as forwarded
-                        await self.storage.mark_message_forwarded(msg_id, source_name, processed['original_text'])
-                        await self.storage.increment_today_post_count()
+                    async with send_lock:
+                        # Another channel may have used up the limit meanwhile
+                        today_count = await self.storage.get_today_post_count()
+                        if today_count >= self.config.MAX_POSTS_PER_DAY:
+                            logger.info(f"⚠️ Daily limit reached ({self.config.MAX_POSTS_PER_DAY})")
+                            break
                         
-                        forwarded_count += 1
-                        logger.info(f"  ✅ [{forwarded_count}] Forwarded old message from {source_name}")
+                        # Apply rate limiting
+                        await self.rate_limiter.acquire()
                         
-                        # Small delay
-                        await asyncio.sleep(1)
+                        # Send directly (no review for old messages)
+                        try:
+                            await self.client.send_message(
+                                self.config.TARGET_CHANNEL,
+                                processed['final_text']
+                            )
+                            
+                            # Mark as forwarded
+                            await self.storage.record_forward(msg_id, source_name, processed['original_text'])
+                            
+                            forwarded_count += 1
+                            logger.info(f"  ✅ [{forwarded_count}] Forwarded old message from {source_name}")
+                            
+                            # Small delay
+                            await asyncio.sleep(1)
                         
-                    except Exception as e:
-                        logger.error(f"Failed to forward old message: {e}")
-                
-                logger.info(f"    📊 Checked {channel_messages} messages from {source}")
-                        
-            except Exception as e:
-                logger.warning(f"Error checking {source} for old messages: {e}")
+                        except Exception as e:
+                            logger.error(f"Failed to forward old message: {e}")
+            finally:
+                producer.cancel()
+                while not processed_queue.empty():
+                    _, task = processed_queue.get_nowait()
+                    task.cancel()
+            
+            logger.info(f"    📊 Checked {channel_messages} messages from {source}")
+                    
+        except Exception as e:
+            logger.warning(f"Error checking {source} for old messages: {e}")
         
-        logger.info(f"📊 Total checked: {total_checked} messages")
-        if forwarded_count > 0:
-            logger.info(f"✅ Forwarded {forwarded_count} old messages from today")
-        else:
-            logger.info("ℹ️ No old messages to forward")
+        return channel_messages, forwarded_count
+    
     
+    async def _process_ahead(
+        self,
+        pending: list,
+        source_name: str,
+        processed_queue: asyncio.Queue
+    ) -> None:
+        """
+        Start processing messages in order, queueing each result's task
+        
+        Args:
+            pending: List of (message ID, message) pairs
+            source_name: Source channel name
+            processed_queue: Bounded queue of (message ID, processing task)
+        """
+        for msg_id, message in pending:
+            task = asyncio.create_task(self.processor.process_message(message, source_name))
+            try:
+                await processed_queue.put((msg_id, task))
+            except asyncio.CancelledError:
+                # Not queued yet, so the consumer's cleanup cannot reach it
+                task.cancel()
+                raise
     
     def _setup_handlers(self) -> None:
         """Setup message handlers"""
@@ -344,7 +455,6 @@ class NewsBot:
             message: Telegram message
         """
         source_name = "Unknown"
-        start_time = datetime.now()
         
         try:
             # Get source channel info
@@ -354,56 +464,50 @@ class NewsBot:
             
             # Record reception
             self.health_server.record_message_processed()
+            self.monitoring.record_message_received(source_name)
             
             # Performance monitoring context
-            with TimedOperation(self.perf_monitor, "processing"):
+            with self.monitoring.measure_processing_time():
                 
                 # Check if already forwarded
-                with TimedOperation(self.perf_monitor, "db"):
+                with self.monitoring.measure_database_operation("is_forwarded"):
                     if await self.storage.is_message_forwarded(msg_id):
-                        logger.debug(f"Message {msg_id} already forwarded, skipping")
-                        self.perf_monitor.record_message_processed(0.0, source_name, forwarded=False)
+                        logger.debug("Message %s already forwarded, skipping", msg_id)
                         return
                 
                 # Check daily limit
-                with TimedOperation(self.perf_monitor, "db"):
+                with self.monitoring.measure_database_operation("today_count"):
                     today_count = await self.storage.get_today_post_count()
                 
                 if today_count >= self.config.MAX_POSTS_PER_DAY:
-                    logger.info(f"Daily limit reached ({self.config.MAX_POSTS_PER_DAY}), skipping")
-                    self.perf_monitor.record_message_processed(0.0, source_name, forwarded=False)
+                    logger.info("Daily limit reached (%d), skipping", self.config.MAX_POSTS_PER_DAY)
                     return
                 
+                # Normalize once for dedup and keyword filtering
+                text = message.text
+                normalized = NormalizedText.from_text(text) if text else None
+                
                 # --- Smart Deduplication ---
-                if message.text and len(message.text) > 50:  # Only check meaningful messages
-                    with TimedOperation(self.perf_monitor, "db"):
+                if normalized and len(normalized.raw) > 50:  # Only check meaningful messages
+                    with self.monitoring.measure_database_operation("recent_messages"):
                         recent_msgs = await self.storage.get_recent_messages(limit=20)
                     
-                    is_dup, score, match = self.deduplicator.is_duplicate(message.text, recent_msgs)
+                    is_dup, score, match = self.deduplicator.is_duplicate(normalized, recent_msgs)
                     
                     if is_dup:
-                        logger.info(f"♻️ Duplicate content detected ({score}% similarity). Skipping.")
-                        logger.debug(f"Matches: {match[:50]}...")
-                        self.perf_monitor.record_message_processed(
-                            (datetime.now() - start_time).total_seconds(),
-                            source_name,
-                            forwarded=False
-                        )
+                        logger.info("♻️ Duplicate content detected (%s%% similarity). Skipping.", score)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Matches: %s...", match[:50])
                         return
                 # ---------------------------
                 
                 # Process message
-                processed = await self.processor.process_message(message, source_name)
+                processed = await self.processor.process_message(message, source_name, normalized)
                 
                 if not processed:
-                    self.perf_monitor.record_message_processed(
-                        (datetime.now() - start_time).total_seconds(),
-                        source_name,
-                        forwarded=False
-                    )
                     return
                 
-                logger.info(f"📨 Message from {source_name}: {processed['reason']}")
+                logger.info("📨 Message from %s: %s", source_name, processed['reason'])
                 
                 # Apply rate limiting
                 await self.rate_limiter.acquire()
@@ -415,60 +519,55 @@ class NewsBot:
                     await self._send_directly(processed)
                 
                 # Mark as forwarded
-                with TimedOperation(self.perf_monitor, "db"):
-                    await self.storage.mark_message_forwarded(
+                with self.monitoring.measure_database_operation("record_forward"):
+                    new_count = await self.storage.record_forward(
                         msg_id,
                         source_name,
                         processed['original_text']
                     )
-                    new_count = await self.storage.increment_today_post_count()
                 
                 # Record success
-                self.perf_monitor.record_message_processed(
-                    (datetime.now() - start_time).total_seconds(),
-                    source_name,
-                    forwarded=True
-                )
+                self.monitoring.record_message_forwarded()
                 
-                logger.info(f"✅ Forwarded! Today: {new_count}/{self.config.MAX_POSTS_PER_DAY}")
+                logger.info("✅ Forwarded! Today: %d/%d", new_count, self.config.MAX_POSTS_PER_DAY)
             
         except FloodWaitError as e:
             logger.warning(f"FloodWaitError: {e.seconds}s", extra={"error_code": "FLOOD_WAIT"})
-            self.perf_monitor.record_rate_limit_hit()
-            self.perf_monitor.record_error("flood_wait")
+            self.monitoring.record_rate_limiter_wait()
+            self.monitoring.record_error("flood_wait")
             await self.rate_limiter.handle_flood_wait(e.seconds)
             
         except be.BotError as e:
             logger.error(be.format_error_message(e))
-            self.perf_monitor.record_error(e.error_code)
+            self.monitoring.record_error(e.error_code)
             
         except Exception as e:
             logger.error(f"Unexpected error: {e}", exc_info=True)
-            self.perf_monitor.record_error("unexpected_error")
+            self.monitoring.record_error("unexpected_error")
     
     async def _send_to_review(self, processed: dict, original_message: Message) -> None:
         """Send message to review channel"""
         try:
-            # Download media if present
-            file_path = await self.processor.download_media(original_message)
+            # The bot account cannot reuse the userbot's media references, so
+            # re-upload a copy (in memory when small, otherwise a file)
+            media = await self.processor.download_media(original_message)
             
             buttons = [
                 [Button.inline("✅ Skelbti", b'approve')],
                 [Button.inline("❌ Ištrinti", b'reject')]
             ]
             
-            await self.bot_client.send_message(
-                self.review_channel,
-                processed['final_text'],
-                file=file_path,
-                buttons=buttons
-            )
-            
-            # Cleanup
-            if file_path:
-                self.processor.cleanup_media_file(file_path)
+            try:
+                await self.bot_client.send_message(
+                    self.review_channel,
+                    processed['final_text'],
+                    file=media,
+                    buttons=buttons
+                )
+            finally:
+                self.processor.cleanup_media_file(media)
             
-            logger.info(f"👀 Sent to review: {self.review_channel}")
+            logger.info("👀 Sent to review: %s", self.review_channel)
             
         except Exception as e:
             raise be.TelegramConnectionError(f"Failed to send to review: {e}")
@@ -482,7 +581,7 @@ class NewsBot:
                 file=processed['media']
             )
             
-            logger.info(f"✅ Sent directly to {self.config.TARGET_CHANNEL}")
+            logger.info("✅ Sent directly to %s", self.config.TARGET_CHANNEL)
             
         except Exception as e:
             raise be.TelegramConnectionError(f"Failed to send directly: {e}")
@@ -522,6 +621,9 @@ class NewsBot:
         # Close database
         await self.storage.close()
         
+        # Close AI client connection pool
+        await self.ai_service.aclose()
+        
         # Disconnect clients
         if self.client.is_connected():
             await self.client.disconnect()
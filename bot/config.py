@@ -2,21 +2,26 @@
 Configuration management with validation
 """
 
-import os
-from typing import List, Optional
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from functools import cached_property, lru_cache
+from typing import List, Optional, Union
+from pydantic import Field, computed_field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
 
+from bot.filters import build_keyword_automaton
+
 # Load environment variables
 load_dotenv()
 
 
-class Config(BaseModel):
+class Config(BaseSettings):
     """
-    Bot configuration with validation
+    Bot configuration with validation, read from environment variables
     """
     
-    model_config = ConfigDict(validate_assignment=True)
+    # Immutable after load; list fields arrive as comma-separated strings
+    # and are split by the validators below instead of being JSON-decoded
+    model_config = SettingsConfigDict(frozen=True, enable_decoding=False)
     
     # === TELEGRAM API ===
     API_ID: int = Field(..., description="Telegram API ID")
@@ -25,12 +30,13 @@ class Config(BaseModel):
     # === CHANNELS ===
     SOURCE_CHANNELS: List[str] = Field(
         default_factory=list,
+        validate_default=True,
         description="Source channels to monitor"
     )
     TARGET_CHANNEL: str = Field(..., description="Target channel for forwarding")
     
     # === FILTERING ===
-    MAX_POSTS_PER_DAY: int = Field(default=0, ge=0)
+    MAX_POSTS_PER_DAY: int = Field(default=5, ge=0)
     KEYWORDS: List[str] = Field(
         default_factory=list,
         description="Keywords to filter messages"
@@ -131,28 +137,28 @@ class Config(BaseModel):
     @classmethod
     def from_env(cls) -> "Config":
         """
-        Create config from environment variables
+        Get config from environment variables
+        
+        Kept for older callers; same cached instance as get_config().
         
         Returns:
             Config instance
         """
-        return cls(
-            API_ID=os.getenv('API_ID', '0'),
-            API_HASH=os.getenv('API_HASH', ''),
-            SOURCE_CHANNELS=os.getenv('SOURCE_CHANNELS', ''),
-            TARGET_CHANNEL=os.getenv('TARGET_CHANNEL', ''),
-            MAX_POSTS_PER_DAY=int(os.getenv('MAX_POSTS_PER_DAY', '5')),
-            KEYWORDS=os.getenv('KEYWORDS', ''),
-            SPAM_KEYWORDS=os.getenv('SPAM_KEYWORDS', ''),
-            GROQ_API_KEY=os.getenv('GROQ_API_KEY'),
-            BOT_TOKEN=os.getenv('BOT_TOKEN'),
-            REVIEW_CHANNEL_ID=os.getenv('REVIEW_CHANNEL_ID'),
-            SENTRY_DSN=os.getenv('SENTRY_DSN'),
-            METRICS_PORT=int(os.getenv('METRICS_PORT', '8080')),
-            ENVIRONMENT=os.getenv('ENVIRONMENT', 'development'),
-            DATABASE_PATH=os.getenv('DATABASE_PATH', 'bot.db'),
-            LOG_LEVEL=os.getenv('LOG_LEVEL', 'INFO'),
-        )
+        return get_config()
+    
+    @computed_field
+    @cached_property
+    def review_channel(self) -> Optional[Union[int, str]]:
+        """Review channel as a numeric ID or username, parsed once"""
+        rc_id = self.REVIEW_CHANNEL_ID
+        if not rc_id:
+            return None
+        return int(rc_id) if rc_id.lstrip('-').isdigit() else rc_id
+    
+    @cached_property
+    def keyword_automaton(self):
+        """Aho-Corasick automaton over KEYWORDS and SPAM_KEYWORDS, built once"""
+        return build_keyword_automaton(self.KEYWORDS, self.SPAM_KEYWORDS)
     
     @property
     def is_production(self) -> bool:
@@ -163,3 +169,14 @@ class Config(BaseModel):
     def is_development(self) -> bool:
         """Check if running in development"""
         return self.ENVIRONMENT == "development"
+
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """
+    Get the process-wide configuration, loading it on first use
+    
+    Returns:
+        Config instance
+    """
+    return Config()
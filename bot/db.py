@@ -0,0 +1,53 @@
+"""
+Shared synchronous SQLite connections
+
+One WAL-configured connection per database path, reused by everything
+that talks to SQLite through the stdlib driver.
+"""
+
+import functools
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Connection tuning applied to every shared connection (WAL is set separately)
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=30000",
+    "PRAGMA foreign_keys=ON",
+)
+
+# SQLite allows a single writer; writers through shared connections take this first
+write_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Get the shared connection for a database, opening it on first use
+    
+    The connection is in autocommit mode (callers open transactions
+    explicitly) and may be used from any thread.
+    
+    Args:
+        db_path: Path to the SQLite database file, or ":memory:"
+    
+    Returns:
+        Configured connection, the same object for every call with db_path
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    
+    # In-memory databases have no journal file to switch
+    if db_path != ":memory:":
+        conn.execute("PRAGMA journal_mode=WAL")
+    
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    
+    logger.debug(f"Opened shared SQLite connection: {db_path}")
+    return conn
@@ -2,13 +2,38 @@
 Smart deduplication logic using fuzzy string matching
 """
 
+import functools
 import logging
-from typing import List, Tuple
-from thefuzz import fuzz
+from typing import List, Tuple, Union
+from rapidfuzz import fuzz, process, utils
+
+from bot.utils import NormalizedText
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=256)
+def _token_signature(text: str) -> str:
+    """
+    Normalized, token-sorted form of text
+    
+    fuzz.ratio over two signatures equals token_sort_ratio over the raw texts,
+    so recent messages are tokenized and sorted once instead of per comparison.
+    """
+    return " ".join(sorted(utils.default_process(text).split()))
+
+
+@functools.lru_cache(maxsize=256)
+def _char_set(signature: str) -> frozenset:
+    """Distinct characters of a signature"""
+    return frozenset(signature)
+
+
+def _matchable_length(signature: str, chars: frozenset, other_chars: frozenset) -> int:
+    """Number of characters in signature that also occur in the other text"""
+    return len(signature) - sum(signature.count(c) for c in chars - other_chars)
+
+
 class Deduplicator:
     """
     Handles message deduplication using fuzzy matching
@@ -23,46 +48,84 @@ class Deduplicator:
         """
         self.threshold = threshold
     
-    def is_duplicate(self, text: str, recent_messages: List[str]) -> Tuple[bool, float, str]:
+    def is_duplicate(
+        self,
+        text: Union[str, NormalizedText],
+        recent_messages: List[str]
+    ) -> Tuple[bool, float, str]:
         """
         Check if text is a duplicate of any recent message
         
         Args:
-            text: New message text
+            text: New message text, raw or already normalized
             recent_messages: List of recent message texts
         
         Returns:
-            Tuple (is_duplicate, similarity_score, matching_text)
+            Tuple (is_duplicate, similarity_score, matching_text);
+            score and text are empty when no duplicate is found
         """
         if not text or not recent_messages:
             return False, 0.0, ""
         
-        best_score = 0
-        best_match = ""
+        if isinstance(text, NormalizedText):
+            signature = text.sorted_tokens
+        else:
+            signature = _token_signature(text)
+        if not signature:
+            return False, 0.0, ""
         
-        # Clean text for better comparison (optional)
-        # text = text.lower().strip()
+        sig_len = len(signature)
+        chars = _char_set(signature)
         
+        # Coarse prefilter before the fuzzy comparison. Similarity ratio is
+        # 2*M/(sum of lens), where M counts matching characters in order;
+        # characters absent from the other text can never match, so
+        # M <= min(matchable lengths) gives an exact upper bound
+        candidates = {}
         for msg in recent_messages:
-            # Skip empty messages
             if not msg:
                 continue
+            msg_signature = _token_signature(msg)
+            msg_len = len(msg_signature)
+            if not msg_len:
+                continue
             
-            # fast calculation first
-            ratio = fuzz.ratio(text, msg)
+            # Length-only bound first (no character scan needed)
+            if 200 * min(sig_len, msg_len) < self.threshold * (sig_len + msg_len):
+                continue
             
-            # If not even close, skip expensive partial_ratio
-            if ratio < 50:
+            msg_chars = _char_set(msg_signature)
+            max_matched = min(
+                _matchable_length(signature, chars, msg_chars),
+                _matchable_length(msg_signature, msg_chars, chars)
+            )
+            if 200 * max_matched < self.threshold * (sig_len + msg_len):
                 continue
-                
-            # Use token_sort_ratio for better accuracy with shuffled words
-            score = fuzz.token_sort_ratio(text, msg)
             
-            if score > best_score:
-                best_score = score
-                best_match = msg
-                
-            if best_score >= self.threshold:
-                return True, best_score, best_match
+            candidates[msg] = msg_signature
+        
+        if not candidates:
+            return False, 0.0, ""
+        
+        # Closest lengths first: likely duplicates score high early, which
+        # raises extractOne's running cutoff and lets it stop at a 100 match
+        candidates = dict(sorted(
+            candidates.items(),
+            key=lambda item: abs(len(item[1]) - sig_len)
+        ))
+        
+        # Token-sorted comparison (robust to shuffled words); the whole
+        # candidate loop runs natively and stops early below the cutoff
+        match = process.extractOne(
+            signature,
+            candidates,
+            scorer=fuzz.ratio,
+            processor=None,
+            score_cutoff=self.threshold
+        )
+        
+        if match is None:
+            return False, 0.0, ""
         
-        return False, best_score, best_match
+        _, best_score, best_match = match
+        return True, best_score, best_match
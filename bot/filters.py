@@ -2,12 +2,117 @@
 Message filtering logic
 """
 
+import functools
 import logging
 import re
-from typing import Tuple, List
+from enum import StrEnum
+from typing import Tuple, List, Optional, Set
+
+try:
+    import ahocorasick
+except ImportError:  # optional: falls back to plain substring scans
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
+# Pattern kinds stored as automaton values
+KIND_KEYWORD = 'keyword'
+KIND_SPAM = 'spam'
+
+# Promotional line markers removed by clean_message_text by default
+DEFAULT_FILTER_PATTERNS = (
+    't.me/',
+    'Подписаться',
+    'КиберТопор',
+    'ТОПОР',
+    'Подпишись',
+    'Канал:',
+)
+
+
+class RejectReason(StrEnum):
+    """Why should_forward rejected a message (a closed set, usable as a metric label)"""
+    
+    EMPTY = "Tuščia žinutė"
+    SPAM = "Spam keyword"
+    NO_KEYWORDS = "Nėra keyword'ų"
+    # Exact repeat of a text already rejected (MessageProcessor shortcut)
+    REPEATED = "Pakartota žinutė"
+
+
+# should_forward result when no keywords are configured
+_FORWARD_ALL_RESULT = (True, "✅ No keyword filter (forwarding all)")
+
+# Three or more consecutive newlines
+_EXCESS_NEWLINES_RE = re.compile(r'\n{3,}')
+
+
+def build_keyword_automaton(keywords: List[str], spam_keywords: List[str]):
+    """
+    Compile keywords and spam keywords into one Aho-Corasick automaton
+    
+    Automata are shared between filters configured with the same words.
+    
+    Args:
+        keywords: Keywords to match
+        spam_keywords: Spam keywords to match
+    
+    Returns:
+        Automaton mapping each lowercased pattern to (pattern, kinds),
+        or None if pyahocorasick is not installed
+    """
+    return _build_automaton(
+        frozenset(word.lower() for word in keywords),
+        frozenset(word.lower() for word in spam_keywords)
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _build_automaton(keywords: frozenset, spam_keywords: frozenset):
+    """Build (once per distinct word sets) the automaton for build_keyword_automaton"""
+    if ahocorasick is None:
+        return None
+    
+    kinds = {}
+    for kind, words in ((KIND_KEYWORD, keywords), (KIND_SPAM, spam_keywords)):
+        for word in words:
+            if word:
+                kinds.setdefault(word, set()).add(kind)
+    
+    automaton = ahocorasick.Automaton()
+    for word, word_kinds in kinds.items():
+        automaton.add_word(word, (word, frozenset(word_kinds)))
+    
+    if kinds:
+        automaton.make_automaton()
+    
+    return automaton
+
+
+def _compile_alternation(words: List[str]):
+    """
+    Compile words into one zero-width alternation that reports every start position
+    
+    Longest words are tried first, so a word that is a prefix of another can
+    still be recovered from the longer hit.
+    
+    Args:
+        words: Lowercased words
+    
+    Returns:
+        Compiled pattern, or None if there are no words
+    """
+    return _compile_alternation_cached(frozenset(word for word in words if word))
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_alternation_cached(words: frozenset):
+    """Compile (once per distinct word set) the pattern for _compile_alternation"""
+    if not words:
+        return None
+    ordered = sorted(words, key=len, reverse=True)
+    return re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))')
+
 
 class MessageFilter:
     """
@@ -18,7 +123,8 @@ class MessageFilter:
         self,
         keywords: List[str],
         spam_keywords: List[str],
-        filter_patterns: List[str] = None
+        filter_patterns: List[str] = None,
+        automaton=None
     ):
         """
         Initialize message filter
@@ -27,56 +133,126 @@ class MessageFilter:
             keywords: List of keywords to match (message must have at least one)
             spam_keywords: List of spam keywords (message rejected if has any)
             filter_patterns: Optional list of patterns to filter from text
+            automaton: Prebuilt automaton from build_keyword_automaton()
         """
         self.keywords = [kw.lower() for kw in keywords]
         self.spam_keywords = [kw.lower() for kw in spam_keywords]
-        self.filter_patterns = filter_patterns or [
-            't.me/',
-            'Подписаться',
-            'КиберТопор',
-            'ТОПОР',
-            'Подпишись',
-            'Канал:',
-        ]
+        self.automaton = automaton or build_keyword_automaton(self.keywords, self.spam_keywords)
+        
+        # Regex fallback when pyahocorasick is not installed
+        self._keyword_re = _compile_alternation(self.keywords)
+        self._spam_re = _compile_alternation(self.spam_keywords)
+        
+        # With neither list configured every non-empty message is accepted
+        self._has_keywords = bool(self.keywords)
+        self._min_keyword_len = min((len(kw) for kw in self.keywords if kw), default=0)
+        self._accept_all = not (self.keywords or self.spam_keywords)
+        # Frozen: the compiled skip regex below is derived from these
+        self.filter_patterns = tuple(filter_patterns or DEFAULT_FILTER_PATTERNS)
+        
+        # One case-insensitive alternation instead of a scan per pattern
+        self._skip_re = re.compile(
+            '|'.join(re.escape(pattern) for pattern in self.filter_patterns),
+            re.IGNORECASE
+        ) if self.filter_patterns else None
         
         logger.info(f"Filter initialized: {len(self.keywords)} keywords, {len(self.spam_keywords)} spam keywords")
     
-    def should_forward(self, message_text: str) -> Tuple[bool, str]:
+    def _scan(self, text_lower: str, stop_on_spam: bool = False) -> Tuple[Set[str], Optional[str]]:
+        """
+        Find keywords and spam keywords present in text
+        
+        Args:
+            text_lower: Lowercased message text
+            stop_on_spam: Return as soon as a spam keyword is found
+        
+        Returns:
+            Tuple of (matched keywords, first spam keyword found or None)
+        """
+        if self.automaton is None or not len(self.automaton):
+            spam_match = self._spam_re.search(text_lower) if self._spam_re else None
+            spam_word = spam_match.group(1) if spam_match else None
+            if spam_word and stop_on_spam:
+                return set(), spam_word
+            return self._regex_keyword_hits(text_lower), spam_word
+        
+        # One pass over the text for all patterns
+        keyword_hits = set()
+        spam_word = None
+        for _, (word, kinds) in self.automaton.iter(text_lower):
+            if KIND_SPAM in kinds and spam_word is None:
+                spam_word = word
+                if stop_on_spam:
+                    break
+            if KIND_KEYWORD in kinds:
+                keyword_hits.add(word)
+        
+        return keyword_hits, spam_word
+    
+    def _regex_keyword_hits(self, text_lower: str) -> Set[str]:
+        """Keywords found in text using the regex fallback"""
+        if self._keyword_re is None:
+            return set()
+        
+        hits = {match.group(1) for match in self._keyword_re.finditer(text_lower)}
+        if not hits:
+            return set()
+        
+        # Shorter keywords hidden inside a longer hit at the same position
+        joined = '\0'.join(hits)
+        return {kw for kw in self.keywords if kw in joined}
+    
+    def quick_reject(self, message_text: str) -> bool:
+        """
+        Cheap check for messages too short to contain any keyword
+        
+        Exact: lowercasing only lengthens 'İ' (U+0130), which is excluded.
+        
+        Args:
+            message_text: Message text to check
+        
+        Returns:
+            True if should_forward would reject the text for lack of keywords
+        """
+        return (
+            len(message_text) < self._min_keyword_len
+            and '\u0130' not in message_text
+        )
+    
+    def should_forward(self, message_text: str, text_lower: str = None) -> Tuple[bool, str]:
         """
         Check if message should be forwarded
         
         Args:
             message_text: Message text to check
+            text_lower: Already lowercased message text, if available
         
         Returns:
-            Tuple of (should_forward: bool, reason: str)
+            Tuple of (should_forward: bool, reason: str); rejections carry a RejectReason
         """
         if not message_text:
-            return False, "Tuščia žinutė"
+            return False, RejectReason.EMPTY
         
-        text_lower = message_text.lower()
+        if self._accept_all:
+            return _FORWARD_ALL_RESULT
+        
+        keyword_hits, spam_word = self._scan(text_lower or message_text.lower(), stop_on_spam=True)
         
         # 1. Check spam keywords first
-        for spam_word in self.spam_keywords:
-            if spam_word in text_lower:
-                return False, f"Spam keyword: {spam_word}"
+        if spam_word:
+            logger.debug("Spam keyword matched: %s", spam_word)
+            return False, RejectReason.SPAM
         
         # 2. Check keywords
         # If no keywords configured, forward EVERYTHING (except spam)
-        if not self.keywords:
-             return True, "✅ No keyword filter (forwarding all)"
+        if not self._has_keywords:
+            return _FORWARD_ALL_RESULT
 
-        # Check against configured keywords
-        has_keyword = False
-        matched_keywords = []
-        
-        for keyword in self.keywords:
-            if keyword in text_lower:
-                has_keyword = True
-                matched_keywords.append(keyword)
+        # Check against configured keywords (in configured order)
+        matched_keywords = [kw for kw in self.keywords if kw in keyword_hits]
         
-        if not has_keyword:
-            return False, "Nėra keyword'ų" # Message rejected
+        if not matched_keywords:
+            return False, RejectReason.NO_KEYWORDS # Message rejected
             
         # All checks passed with keywords
         keywords_str = ', '.join(matched_keywords[:3])
@@ -96,23 +272,17 @@ class MessageFilter:
             return ""
         
         lines = text.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Skip lines with filter patterns
-            should_skip = False
-            for pattern in self.filter_patterns:
-                if pattern.lower() in line.lower():
-                    should_skip = True
-                    break
-            
-            if not should_skip:
-                cleaned_lines.append(line)
         
-        cleaned = '\n'.join(cleaned_lines).strip()
+        # Skip lines with filter patterns
+        if self._skip_re is not None:
+            search = self._skip_re.search
+            lines = [line for line in lines if not search(line)]
         
-        # Remove excessive newlines
-        cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
+        cleaned = '\n'.join(lines).strip()
+        
+        # Remove excessive newlines (substring check skips the regex for most texts)
+        if '\n\n\n' in cleaned:
+            cleaned = _EXCESS_NEWLINES_RE.sub('\n\n', cleaned)
         
         return cleaned
     
@@ -129,14 +299,9 @@ class MessageFilter:
         if not text:
             return []
         
-        text_lower = text.lower()
-        matched = []
-        
-        for keyword in self.keywords:
-            if keyword in text_lower:
-                matched.append(keyword)
+        keyword_hits, _ = self._scan(text.lower())
         
-        return matched
+        return [kw for kw in self.keywords if kw in keyword_hits]
     
     def is_spam(self, text: str) -> bool:
         """
@@ -151,10 +316,6 @@ class MessageFilter:
         if not text:
             return False
         
-        text_lower = text.lower()
-        
-        for spam_word in self.spam_keywords:
-            if spam_word in text_lower:
-                return True
+        _, spam_word = self._scan(text.lower(), stop_on_spam=True)
         
-        return False
+        return spam_word is not None
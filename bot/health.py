@@ -4,12 +4,36 @@ Health check HTTP server for liveness and readiness probes
 
 import asyncio
 import logging
+import time
 from aiohttp import web
-from typing import Optional, Callable
+from typing import Any, Awaitable, Callable, Optional
 from datetime import datetime
 
+from bot.performance import get_performance_monitor
+
+try:
+    from orjson import dumps as json_dumps
+except ImportError:  # optional: stdlib encoder is slower but equivalent
+    import json
+    
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 logger = logging.getLogger(__name__)
 
+# How long probe results are reused (seconds)
+READY_CACHE_TTL = 2.0
+STATS_CACHE_TTL = 5.0
+METRICS_CACHE_TTL = 1.0
+
+# Pre-encoded liveness response prefix
+_HEALTH_PREFIX = b'{"status":"healthy","uptime_seconds":'
+
+
+def _json_response(data: dict, status: int = 200) -> web.Response:
+    """Build a JSON response from pre-encoded bytes"""
+    return web.Response(body=json_dumps(data), status=status, content_type='application/json')
+
 
 class HealthCheckServer:
     """
@@ -38,8 +62,19 @@ class HealthCheckServer:
         self.site: Optional[web.TCPSite] = None
         
         self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
         self.is_ready = False
-        self.last_message_time: Optional[datetime] = None
+        self._last_message_monotonic: Optional[float] = None
+        
+        # Probe results by name as (loop time, value), and in-flight probes
+        self._probe_cache: dict = {}
+        self._probe_inflight: dict = {}
+        
+        # Metrics content type never changes; rendered body is cached briefly
+        self._metrics_headers = (
+            {'Content-Type': monitoring.get_content_type()} if monitoring else None
+        )
+        self._metrics_cache: Optional[tuple] = None
         
         # Setup routes
         self.app.router.add_get('/', self.health_handler)  # Root redirects to health
@@ -82,7 +117,59 @@ class HealthCheckServer:
     
     def record_message_processed(self) -> None:
         """Record that a message was processed"""
-        self.last_message_time = datetime.now()
+        self._last_message_monotonic = time.monotonic()
+    
+    @property
+    def last_message_time(self) -> Optional[datetime]:
+        """Wall-clock time of the last processed message, converted on demand"""
+        if self._last_message_monotonic is None:
+            return None
+        return datetime.fromtimestamp(time.time() - (time.monotonic() - self._last_message_monotonic))
+    
+    async def _cached_probe(self, name: str, ttl: float, probe: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a probe at most once per TTL, sharing one in-flight call
+        
+        Args:
+            name: Cache key
+            ttl: Seconds a result stays valid
+            probe: Coroutine function producing the result (must not raise)
+        
+        Returns:
+            Cached or fresh probe result
+        """
+        loop = asyncio.get_running_loop()
+        cached = self._probe_cache.get(name)
+        if cached and loop.time() - cached[0] < ttl:
+            return cached[1]
+        
+        task = self._probe_inflight.get(name)
+        if task is None:
+            task = asyncio.ensure_future(probe())
+            self._probe_inflight[name] = task
+            task.add_done_callback(lambda _: self._probe_inflight.pop(name, None))
+        
+        # Shield so one disconnected client does not cancel the shared probe
+        value = await asyncio.shield(task)
+        self._probe_cache[name] = (loop.time(), value)
+        return value
+    
+    async def _check_database(self) -> bool:
+        """Ping the database, returning whether it is healthy"""
+        try:
+            await self.storage.ping()
+            return True
+        except Exception as e:
+            logger.error(f"Database health check failed: {e}")
+            return False
+    
+    async def _fetch_database_stats(self) -> dict:
+        """Get database statistics, or an error entry"""
+        try:
+            return await self.storage.get_stats()
+        except Exception as e:
+            logger.error(f"Failed to get database stats: {e}")
+            return {'error': str(e)}
     
     async def health_handler(self, request: web.Request) -> web.Response:
         """
@@ -90,15 +177,14 @@ class HealthCheckServer:
         
         Returns 200 if service is running
         """
-        uptime = (datetime.now() - self.start_time).total_seconds()
+        uptime = int(time.monotonic() - self._start_monotonic)
         
-        health_data = {
-            'status': 'healthy',
-            'uptime_seconds': int(uptime),
-            'timestamp': datetime.now().isoformat()
-        }
+        # Same JSON as before, spliced from bytes instead of json.dumps
+        body = b'%s%d,"timestamp":"%s"}' % (
+            _HEALTH_PREFIX, uptime, datetime.now().isoformat().encode()
+        )
         
-        return web.json_response(health_data, status=200)
+        return web.Response(body=body, status=200, content_type='application/json')
     
     async def ready_handler(self, request: web.Request) -> web.Response:
         """
@@ -107,23 +193,18 @@ class HealthCheckServer:
         Returns 200 if ready, 503 if not ready
         """
         if not self.is_ready:
-            return web.json_response(
+            return _json_response(
                 {'status': 'not_ready', 'reason': 'Service not initialized'},
                 status=503
             )
         
-        # Check database connection
+        # Check database connection (shared between concurrent probes)
         db_healthy = True
         if self.storage:
-            try:
-                # Simple database check
-                await self.storage.get_today_post_count()
-            except Exception as e:
-                logger.error(f"Database health check failed: {e}")
-                db_healthy = False
+            db_healthy = await self._cached_probe('ready', READY_CACHE_TTL, self._check_database)
         
         if not db_healthy:
-            return web.json_response(
+            return _json_response(
                 {'status': 'not_ready', 'reason': 'Database not healthy'},
                 status=503
             )
@@ -135,7 +216,7 @@ class HealthCheckServer:
             'timestamp': datetime.now().isoformat()
         }
         
-        return web.json_response(ready_data, status=200)
+        return _json_response(ready_data, status=200)
     
     async def metrics_handler(self, request: web.Request) -> web.Response:
         """
@@ -147,9 +228,12 @@ class HealthCheckServer:
             return web.Response(text="Monitoring not configured", status=503)
         
         try:
-            metrics = self.monitoring.get_metrics()
-            content_type = self.monitoring.get_content_type()
-            return web.Response(body=metrics, content_type=content_type)
+            now = asyncio.get_running_loop().time()
+            if self._metrics_cache is None or now - self._metrics_cache[0] >= METRICS_CACHE_TTL:
+                self._metrics_cache = (now, self.monitoring.get_metrics())
+            
+            # Passed as a header: aiohttp rejects a charset in content_type=
+            return web.Response(body=self._metrics_cache[1], headers=self._metrics_headers)
         except Exception as e:
             logger.error(f"Failed to generate metrics: {e}")
             return web.Response(text=f"Error: {e}", status=500)
@@ -161,23 +245,19 @@ class HealthCheckServer:
         Returns JSON with current statistics
         """
         stats = {
-            'uptime_seconds': int((datetime.now() - self.start_time).total_seconds()),
+            'uptime_seconds': int(time.monotonic() - self._start_monotonic),
             'ready': self.is_ready,
             'last_message_time': self.last_message_time.isoformat() if self.last_message_time else None,
         }
         
         # Add database stats if available
         if self.storage:
-            try:
-                db_stats = await self.storage.get_stats()
-                stats['database'] = db_stats
-            except Exception as e:
-                logger.error(f"Failed to get database stats: {e}")
-                stats['database'] = {'error': str(e)}
-        
-        # Add performance metrics
-        from bot.performance import get_performance_monitor
-        monitor = get_performance_monitor()
-        stats['performance'] = monitor.get_metrics()
-        
-        return web.json_response(stats, status=200)
+            stats['database'] = await self._cached_probe(
+                'stats', STATS_CACHE_TTL, self._fetch_database_stats
+            )
+        
+        # Add performance metrics (derived from the Prometheus registry)
+        monitor = self.monitoring or get_performance_monitor()
+        stats['performance'] = monitor.get_stats()
+        
+        return _json_response(stats, status=200)
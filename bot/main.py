@@ -3,7 +3,10 @@ Main entry point for the Telegram News Bot
 """
 
 import asyncio
+import atexit
 import logging
+import logging.handlers
+import queue
 import signal
 import sys
 import os
@@ -15,28 +18,48 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-from bot.config import Config
+from bot.config import get_config
 from bot.storage import Storage
 from bot.monitoring import Monitoring
 from bot.health import HealthCheckServer
 from bot.client import NewsBot
+from bot.utils import BufferedFileHandler
 
 
 def setup_logging(log_level: str = "INFO") -> None:
     """
     Setup logging configuration
     
+    Records are queued on the calling thread and written to the file and
+    stdout by a background listener, so the event loop never blocks on I/O.
+    
     Args:
         log_level: Logging level
     """
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    file_handler = BufferedFileHandler('logs/bot.log', encoding='utf-8')
+    stream_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
     logging.basicConfig(
         level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('logs/bot.log', encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        file_handler,
+        stream_handler,
+        respect_handler_level=True
     )
+    listener.start()
+    
+    # Flush queued and buffered records on any exit path (runs before the
+    # logging module's own shutdown, which then closes the file handler)
+    atexit.register(listener.stop)
     
     # Reduce noise from libraries
     logging.getLogger('telethon').setLevel(logging.WARNING)
@@ -47,7 +70,7 @@ async def main() -> None:
     """Main entry point"""
     # Load configuration
     try:
-        config = Config.from_env()
+        config = get_config()
         print(f"✅ Configuration loaded (Environment: {config.ENVIRONMENT})")
     except Exception as e:
         print(f"❌ Configuration error: {e}")
@@ -120,15 +143,18 @@ async def main() -> None:
         
         # Run bot in background task
         bot_task = asyncio.create_task(bot.start())
+        stop_task = asyncio.create_task(stop_event.wait())
         
-        # Monitor stop event
-        # On Windows, we need to poll to catch KeyboardInterrupt
-        while not stop_event.is_set():
-            if bot_task.done():
-                if bot_task.exception():
-                    raise bot_task.exception()
-                break
-            await asyncio.sleep(0.5)
+        # Wait for either the bot to exit or a stop signal (no polling);
+        # on Windows, Ctrl+C cancels this task via asyncio.run
+        done, _ = await asyncio.wait(
+            {bot_task, stop_task},
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        stop_task.cancel()
+        
+        if bot_task in done and not bot_task.cancelled() and bot_task.exception():
+            raise bot_task.exception()
             
     except asyncio.CancelledError:
         logger.info("Main task cancelled")
@@ -147,6 +173,13 @@ if __name__ == "__main__":
     # Windows compatibility for asyncio
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    else:
+        # libuv-based event loop (optional, faster callbacks and socket I/O)
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     
     try:
         asyncio.run(main())
@@ -4,16 +4,24 @@ Database migration utilities
 Simple migration system for SQLite database schema changes.
 """
 
+import bisect
 import logging
 import sqlite3
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from bot.db import get_connection, write_lock
 
 logger = logging.getLogger(__name__)
 
 
 class Migration:
-    """Base class for database migrations"""
+    """
+    Base class for database migrations
+    
+    up() and down() must not commit: MigrationManager runs every pending
+    migration inside one transaction and commits (or rolls back) once.
+    """
     
     version: int = 0
     description: str = ""
@@ -55,13 +63,10 @@ class Migration001_InitialSchema(Migration):
             CREATE INDEX IF NOT EXISTS idx_forwarded_date 
             ON forwarded_messages(forwarded_at)
         """)
-        
-        conn.commit()
     
     def down(self, conn: sqlite3.Connection) -> None:
         conn.execute("DROP TABLE IF EXISTS forwarded_messages")
         conn.execute("DROP TABLE IF EXISTS daily_stats")
-        conn.commit()
 
 
 class Migration002_AddMetadata(Migration):
@@ -72,8 +77,7 @@ class Migration002_AddMetadata(Migration):
     
     def up(self, conn: sqlite3.Connection) -> None:
         # Check if columns already exist
-        cursor = conn.execute("PRAGMA table_info(forwarded_messages)")
-        columns = [row[1] for row in cursor.fetchall()]
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(forwarded_messages)")}
         
         if 'processed_text' not in columns:
             conn.execute("""
@@ -86,8 +90,6 @@ class Migration002_AddMetadata(Migration):
                 ALTER TABLE forwarded_messages 
                 ADD COLUMN tags TEXT
             """)
-        
-        conn.commit()
     
     def down(self, conn: sqlite3.Connection) -> None:
         # SQLite doesn't support DROP COLUMN easily
@@ -101,13 +103,42 @@ MIGRATIONS: List[Migration] = [
     Migration002_AddMetadata(),
 ]
 
+# Registry versions, for bisecting to the migrations after a given version
+_VERSIONS = [m.version for m in MIGRATIONS]
+assert all(a < b for a, b in zip(_VERSIONS, _VERSIONS[1:])), "MIGRATIONS must be in strictly increasing version order"
+
+
+def _migrations_between(low: int, high: Optional[int] = None) -> List[Migration]:
+    """
+    Registered migrations with low < version <= high, in order
+    
+    Args:
+        low: Exclusive lower version bound
+        high: Inclusive upper version bound (None for no bound)
+    
+    Returns:
+        Slice of MIGRATIONS
+    """
+    start = bisect.bisect_right(_VERSIONS, low)
+    end = len(_VERSIONS) if high is None else bisect.bisect_right(_VERSIONS, high)
+    return MIGRATIONS[start:end]
+
 
 class MigrationManager:
     """Manages database migrations"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, conn: Optional[sqlite3.Connection] = None):
+        """
+        Initialize migration manager
+        
+        Args:
+            db_path: Path to the SQLite database
+            conn: Connection to use (must be in autocommit mode); defaults to
+                the shared connection for db_path, which is never closed here
+        """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = conn or get_connection(db_path)
         self._ensure_migration_table()
     
     def _ensure_migration_table(self) -> None:
@@ -119,7 +150,6 @@ class MigrationManager:
                 applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
-        self.conn.commit()
     
     def get_current_version(self) -> int:
         """Get current schema version"""
@@ -132,7 +162,7 @@ class MigrationManager:
     def get_pending_migrations(self) -> List[Migration]:
         """Get list of pending migrations"""
         current = self.get_current_version()
-        return [m for m in MIGRATIONS if m.version > current]
+        return _migrations_between(current)
     
     def migrate(self, target_version: int = None) -> None:
         """Run pending migrations up to target version"""
@@ -143,27 +173,42 @@ class MigrationManager:
             logger.info(f"Database is up to date (version {current})")
             return
         
-        for migration in pending:
-            if target_version and migration.version > target_version:
-                break
-            
-            logger.info(f"Applying migration {migration.version}: {migration.description}")
-            
-            try:
-                migration.up(self.conn)
-                
-                self.conn.execute(
-                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
-                    (migration.version, migration.description)
-                )
-                self.conn.commit()
+        # One transaction for the whole run: a single durable write, all or nothing
+        with write_lock:
+            applied = self._apply(pending, target_version)
+        
+        for migration in applied:
+            logger.info(f"✅ Migration {migration.version} applied successfully")
+    
+    def _apply(self, pending: List[Migration], target_version: Optional[int]) -> List[Migration]:
+        """Apply pending migrations in one transaction, returning those applied"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        applied = []
+        migration = None
+        
+        try:
+            for migration in pending:
+                if target_version and migration.version > target_version:
+                    break
                 
-                logger.info(f"✅ Migration {migration.version} applied successfully")
+                logger.info(f"Applying migration {migration.version}: {migration.description}")
                 
-            except Exception as e:
-                logger.error(f"❌ Migration {migration.version} failed: {e}")
-                self.conn.rollback()
-                raise
+                migration.up(self.conn)
+                applied.append(migration)
+            
+            # Record every applied version with one prepared statement
+            self.conn.executemany(
+                "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                [(m.version, m.description) for m in applied]
+            )
+            self.conn.execute("COMMIT")
+            
+        except Exception as e:
+            logger.error(f"❌ Migration {migration.version} failed: {e}")
+            self.conn.execute("ROLLBACK")
+            raise
+        
+        return applied
     
     def rollback(self, target_version: int) -> None:
         """Rollback to target version"""
@@ -173,29 +218,35 @@ class MigrationManager:
             logger.warning("Target version is >= current version, nothing to rollback")
             return
         
-        migrations_to_revert = [
-            m for m in reversed(MIGRATIONS)
-            if target_version < m.version <= current
-        ]
+        migrations_to_revert = _migrations_between(target_version, current)[::-1]
+        
+        with write_lock:
+            self._revert(migrations_to_revert)
         
         for migration in migrations_to_revert:
-            logger.info(f"Reverting migration {migration.version}: {migration.description}")
-            
-            try:
-                migration.down(self.conn)
-                
-                self.conn.execute(
-                    "DELETE FROM schema_migrations WHERE version = ?",
-                    (migration.version,)
-                )
-                self.conn.commit()
-                
-                logger.info(f"✅ Migration {migration.version} reverted successfully")
+            logger.info(f"✅ Migration {migration.version} reverted successfully")
+    
+    def _revert(self, migrations_to_revert: List[Migration]) -> None:
+        """Revert migrations in one transaction"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        migration = None
+        
+        try:
+            for migration in migrations_to_revert:
+                logger.info(f"Reverting migration {migration.version}: {migration.description}")
                 
-            except Exception as e:
-                logger.error(f"❌ Rollback {migration.version} failed: {e}")
-                self.conn.rollback()
-                raise
+                migration.down(self.conn)
+            
+            self.conn.executemany(
+                "DELETE FROM schema_migrations WHERE version = ?",
+                [(m.version,) for m in migrations_to_revert]
+            )
+            self.conn.execute("COMMIT")
+            
+        except Exception as e:
+            logger.error(f"❌ Rollback {migration.version} failed: {e}")
+            self.conn.execute("ROLLBACK")
+            raise
     
     def status(self) -> List[Tuple[int, str, bool]]:
         """Get migration status"""
@@ -209,8 +260,7 @@ class MigrationManager:
         return status
     
     def close(self) -> None:
-        """Close database connection"""
-        self.conn.close()
+        """Nothing to close: the connection is shared or owned by the caller"""
 
 
 if __name__ == "__main__":
@@ -218,7 +268,7 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python migrations.py [migrate|rollback|status] [version]")
+        print("Usage: python -m bot.migrations [migrate|rollback|status] [version]")
         sys.exit(1)
     
     command = sys.argv[1]
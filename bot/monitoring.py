@@ -5,12 +5,23 @@ Monitoring and observability with Sentry and Prometheus
 import logging
 import sentry_sdk
 from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from typing import Optional
+from typing import Iterable, Optional
 from contextlib import contextmanager
 import time
 
 logger = logging.getLogger(__name__)
 
+# Processing-time samples are buffered and observed in batches of this size,
+# or once the oldest buffered sample is this many seconds old
+PROCESSING_FLUSH_SIZE = 64
+PROCESSING_FLUSH_INTERVAL = 0.1
+
+# Source label shared by messages from sources not registered at startup
+OTHER_SOURCE = "_other"
+
+# How long get_stats() results are reused (seconds)
+STATS_CACHE_TTL = 1.0
+
 
 # Prometheus metrics
 messages_received = Counter(
@@ -57,6 +68,75 @@ database_operations = Histogram(
     ['operation']
 )
 
+ai_request_duration = Histogram(
+    'bot_ai_request_seconds',
+    'Time spent on successful AI requests'
+)
+
+ai_request_errors = Counter(
+    'bot_ai_request_errors_total',
+    'Total failed AI requests'
+)
+
+
+def _samples(metric, suffix: str) -> list:
+    """
+    Current samples of a metric
+    
+    Args:
+        metric: Prometheus metric
+        suffix: Sample name suffix to keep ('_total', '_count', '_sum')
+    
+    Returns:
+        List of (labels, value) tuples
+    """
+    return [
+        (sample.labels, sample.value)
+        for family in metric.collect()
+        for sample in family.samples
+        if sample.name.endswith(suffix)
+    ]
+
+
+def _sum_samples(metric, suffix: str = '_total') -> float:
+    """Sum of a metric's samples over all label values"""
+    return sum(value for _, value in _samples(metric, suffix))
+
+
+def _histogram_totals(metric) -> tuple:
+    """(observation count, sum of observations) of a histogram over all label values"""
+    count = total = 0.0
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name.endswith('_count'):
+                count += sample.value
+            elif sample.name.endswith('_sum'):
+                total += sample.value
+    return count, total
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """numerator / denominator, or 0 when the denominator is 0"""
+    return numerator / denominator if denominator else 0
+
+
+def _bound(cache: dict, metric, label_value: str):
+    """
+    Get a metric's child for a label value, binding it once
+    
+    Args:
+        cache: Per-metric dict of already bound children
+        metric: Metric with a single label
+        label_value: Value of that label
+    
+    Returns:
+        Labelled child metric
+    """
+    child = cache.get(label_value)
+    if child is None:
+        child = cache[label_value] = metric.labels(label_value)
+    return child
+
 
 class Monitoring:
     """
@@ -73,6 +153,23 @@ class Monitoring:
         """
         self.environment = environment
         self.sentry_enabled = False
+        self._start_monotonic = time.monotonic()
+        
+        # Buffered processing-time samples (seconds), see _flush_processing_times()
+        self._processing_buffer: list = []
+        self._processing_flushed_at = self._start_monotonic
+        
+        # Last get_stats() result as (monotonic time, stats)
+        self._stats_cache: Optional[tuple] = None
+        
+        # Labelled children by label value, so each event skips labels()
+        self._received_children: dict = {}
+        self._rejected_children: dict = {}
+        self._error_children: dict = {}
+        self._db_operation_children: dict = {}
+        
+        # Set once register_sources() closes the source label set
+        self._sources_registered = False
         
         # Initialize Sentry if DSN provided
         if sentry_dsn:
@@ -90,19 +187,35 @@ class Monitoring:
         else:
             logger.info("Sentry not configured (no DSN provided)")
     
+    def register_sources(self, sources: Iterable[str]) -> None:
+        """
+        Pre-bind the received counter for each known source channel
+        
+        Afterwards messages from any other source are counted under
+        OTHER_SOURCE, which keeps the label set bounded.
+        
+        Args:
+            sources: Source channel names, as passed to record_message_received
+        """
+        for source in sources:
+            _bound(self._received_children, messages_received, source)
+        self._sources_registered = True
+    
     def record_message_received(self, source_channel: str) -> None:
         """Record message received from source channel"""
-        messages_received.labels(source_channel=source_channel).inc()
+        child = self._received_children.get(source_channel)
+        if child is None:
+            label = OTHER_SOURCE if self._sources_registered else source_channel
+            child = _bound(self._received_children, messages_received, label)
+        child.inc()
     
     def record_message_forwarded(self) -> None:
         """Record message forwarded"""
         messages_forwarded.inc()
     
     def record_message_rejected(self, reason: str) -> None:
-        """Record message rejected"""
-        # Normalize reason for better grouping
-        normalized_reason = reason.split(':')[0] if ':' in reason else reason
-        messages_rejected.labels(reason=normalized_reason).inc()
+        """Record message rejected (reason is a RejectReason, already a closed label set)"""
+        _bound(self._rejected_children, messages_rejected, reason).inc()
     
     def record_error(self, error_type: str, error: Exception = None) -> None:
         """
@@ -112,7 +225,7 @@ class Monitoring:
             error_type: Type of error
             error: Optional exception object
         """
-        errors_total.labels(error_type=error_type).inc()
+        _bound(self._error_children, errors_total, error_type).inc()
         
         if self.sentry_enabled and error:
             sentry_sdk.capture_exception(error)
@@ -128,22 +241,48 @@ class Monitoring:
     @contextmanager
     def measure_processing_time(self):
         """Context manager to measure message processing time"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         try:
             yield
         finally:
-            duration = time.time() - start_time
-            processing_time.observe(duration)
+            self._processing_buffer.append((time.perf_counter_ns() - start_ns) / 1e9)
+            if (
+                len(self._processing_buffer) >= PROCESSING_FLUSH_SIZE
+                or time.monotonic() - self._processing_flushed_at >= PROCESSING_FLUSH_INTERVAL
+            ):
+                self._flush_processing_times()
+    
+    def _flush_processing_times(self) -> None:
+        """Observe buffered processing-time samples into the histogram"""
+        # Swap first so samples recorded meanwhile land in the new buffer
+        samples, self._processing_buffer = self._processing_buffer, []
+        self._processing_flushed_at = time.monotonic()
+        
+        observe = processing_time.observe
+        for duration in samples:
+            observe(duration)
     
     @contextmanager
     def measure_database_operation(self, operation: str):
         """Context manager to measure database operation time"""
-        start_time = time.time()
+        histogram = _bound(self._db_operation_children, database_operations, operation)
+        start_ns = time.perf_counter_ns()
         try:
             yield
         finally:
-            duration = time.time() - start_time
-            database_operations.labels(operation=operation).observe(duration)
+            histogram.observe((time.perf_counter_ns() - start_ns) / 1e9)
+    
+    @contextmanager
+    def measure_ai_request(self):
+        """Context manager to measure an AI request (failures are counted, not timed)"""
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        except Exception:
+            ai_request_errors.inc()
+            raise
+        else:
+            ai_request_duration.observe((time.perf_counter_ns() - start_ns) / 1e9)
     
     def get_metrics(self) -> bytes:
         """
@@ -152,12 +291,124 @@ class Monitoring:
         Returns:
             Metrics as bytes
         """
+        self._flush_processing_times()
         return generate_latest()
     
     def get_content_type(self) -> str:
         """Get Prometheus content type"""
         return CONTENT_TYPE_LATEST
     
+    def get_stats(self) -> dict:
+        """
+        Get human-readable statistics derived from the Prometheus metrics
+        
+        Returns:
+            Dictionary with processing, source, error, database, AI
+            and rate limiting statistics (reused for STATS_CACHE_TTL seconds)
+        """
+        now = time.monotonic()
+        if self._stats_cache and now - self._stats_cache[0] < STATS_CACHE_TTL:
+            return self._stats_cache[1]
+        
+        self._flush_processing_times()
+        uptime = now - self._start_monotonic
+        
+        by_source = {
+            labels['source_channel']: int(value)
+            for labels, value in _samples(messages_received, '_total')
+        }
+        by_error = {
+            labels['error_type']: int(value)
+            for labels, value in _samples(errors_total, '_total')
+        }
+        
+        processed = sum(by_source.values())
+        forwarded = int(_sum_samples(messages_forwarded))
+        errors = sum(by_error.values())
+        per_message = 1.0 / processed if processed else 0
+        
+        processing_count, processing_sum = _histogram_totals(processing_time)
+        db_count, db_sum = _histogram_totals(database_operations)
+        ai_count, ai_sum = _histogram_totals(ai_request_duration)
+        ai_errors = int(_sum_samples(ai_request_errors))
+        ai_requests = int(ai_count) + ai_errors
+        
+        stats = {
+            "uptime_seconds": uptime,
+            "processing": {
+                "total_processed": processed,
+                "total_forwarded": forwarded,
+                "total_rejected": int(_sum_samples(messages_rejected)),
+                "forward_rate": forwarded * per_message,
+                "avg_time_ms": round(_ratio(processing_sum, processing_count) * 1000, 2),
+                "messages_per_minute": _ratio(processed, uptime / 60)
+            },
+            "sources": by_source,
+            "errors": {
+                "total": errors,
+                "by_type": by_error,
+                "error_rate": errors * per_message
+            },
+            "database": {
+                "query_count": int(db_count),
+                "avg_query_time_ms": round(_ratio(db_sum, db_count) * 1000, 2),
+                "queries_per_message": db_count * per_message
+            },
+            "ai": {
+                "requests": ai_requests,
+                "errors": ai_errors,
+                "avg_response_time_ms": round(_ratio(ai_sum, ai_count) * 1000, 2),
+                "error_rate": _ratio(ai_errors, ai_requests)
+            },
+            "rate_limiting": {
+                "hits": int(_sum_samples(rate_limiter_waits))
+            }
+        }
+        
+        self._stats_cache = (now, stats)
+        return stats
+    
+    def get_summary(self) -> str:
+        """
+        Get human-readable summary
+        
+        Returns:
+            Formatted summary string
+        """
+        stats = self.get_stats()
+        
+        summary = f"""
+Performance Summary:
+-------------------
+Uptime: {stats['uptime_seconds']:.0f}s
+
+Processing:
+  - Total: {stats['processing']['total_processed']}
+  - Forwarded: {stats['processing']['total_forwarded']}
+  - Rejected: {stats['processing']['total_rejected']}
+  - Forward Rate: {stats['processing']['forward_rate']:.1%}
+  - Avg Time: {stats['processing']['avg_time_ms']}ms
+  - Throughput: {stats['processing']['messages_per_minute']:.1f} msg/min
+
+Errors:
+  - Total: {stats['errors']['total']}
+  - Error Rate: {stats['errors']['error_rate']:.1%}
+
+Database:
+  - Queries: {stats['database']['query_count']}
+  - Avg Time: {stats['database']['avg_query_time_ms']}ms
+
+AI:
+  - Requests: {stats['ai']['requests']}
+  - Errors: {stats['ai']['errors']}
+  - Avg Time: {stats['ai']['avg_response_time_ms']}ms
+"""
+        return summary
+    
+    def log_summary(self) -> None:
+        """Log performance summary"""
+        logger.info(self.get_summary())
+    
     def capture_message(self, message: str, level: str = "info") -> None:
         """
         Capture message in Sentry
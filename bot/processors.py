@@ -2,17 +2,33 @@
 Message processing pipeline
 """
 
+import hashlib
+import io
 import logging
 import os
-from typing import Optional
+from typing import Optional, Union
 from telethon.tl.types import Message
 
-from bot.filters import MessageFilter
+from bot.filters import MessageFilter, RejectReason
 from bot.ai_service import AIService
-from bot.utils import truncate_text, MAX_CAPTION_LENGTH
+from bot.monitoring import Monitoring
+from bot.utils import truncate_text, utf16_len, CircularBuffer, MAX_CAPTION_LENGTH, NormalizedText
 
 logger = logging.getLogger(__name__)
 
+# Fingerprints of recently processed texts remembered for the pipeline shortcut
+RECENT_FINGERPRINTS_SIZE = 1000
+
+# Media up to this size (bytes) is buffered in memory; larger or unknown
+# sizes (videos and documents reach several GB) are downloaded to disk
+MAX_IN_MEMORY_MEDIA_SIZE = 20 * 1024 * 1024
+
+# Footer for each reliability score 0-10 (red below 5, yellow below 8)
+_RELIABILITY_FOOTERS = tuple(
+    f"🤖 Patikimumas: {'🟢' if score >= 8 else '🟡' if score >= 5 else '🔴'} {score}/10"
+    for score in range(11)
+)
+
 
 class MessageProcessor:
     """
@@ -22,7 +38,8 @@ class MessageProcessor:
     def __init__(
         self,
         message_filter: MessageFilter,
-        ai_service: AIService
+        ai_service: AIService,
+        monitoring: Optional[Monitoring] = None
     ):
         """
         Initialize message processor
@@ -30,16 +47,33 @@ class MessageProcessor:
         Args:
             message_filter: Message filter instance
             ai_service: AI service instance
+            monitoring: Monitoring instance for rejection counts (optional)
         """
         self.filter = message_filter
         self.ai = ai_service
+        self.monitoring = monitoring
+        
+        # Fixed for the processor's lifetime: without Groq the analysis is
+        # rule-based and computed inline instead of awaited
+        self._ai_enabled = ai_service.enabled
+        
+        # Texts the filter rejected; filtering is deterministic, so a repeat
+        # would be rejected again. Accepted texts are never remembered here,
+        # so a failed or skipped send can still be retried.
+        self._recent_fingerprints = CircularBuffer(RECENT_FINGERPRINTS_SIZE)
         
         logger.info("Message processor initialized")
     
+    def _record_rejection(self, reason: RejectReason) -> None:
+        """Count a filter rejection when monitoring is attached"""
+        if self.monitoring is not None:
+            self.monitoring.record_message_rejected(reason)
+    
     async def process_message(
         self,
         message: Message,
-        source_channel: str
+        source_channel: str,
+        normalized: Optional[NormalizedText] = None
     ) -> Optional[dict]:
         """
         Process a message through the pipeline
@@ -47,22 +81,45 @@ class MessageProcessor:
         Args:
             message: Telegram message object
             source_channel: Source channel name
+            normalized: Message text normalized by the caller, if available
         
         Returns:
             Processed message data or None if rejected
         """
-        # Extract text
-        original_text = message.text or message.message or ""
+        # Extract text (message.text re-renders entities on every access, so
+        # reuse the caller's normalized copy of it when there is one)
+        if normalized is not None:
+            original_text = normalized.raw
+            text_lower = normalized.lower
+        else:
+            original_text = message.text or message.message or ""
+            text_lower = None
         
         if not original_text:
             logger.debug("Message has no text, skipping")
+            self._record_rejection(RejectReason.EMPTY)
+            return None
+        
+        # Cheap length check before the full keyword scan
+        if self.filter.quick_reject(original_text):
+            logger.info("Message rejected: %s", RejectReason.NO_KEYWORDS)
+            self._record_rejection(RejectReason.NO_KEYWORDS)
+            return None
+        
+        # Exact repeats of a rejected text (cross-posts, reposts) skip the scan
+        fingerprint = hashlib.blake2b(original_text.encode(), digest_size=8).digest()
+        if self._recent_fingerprints.contains(fingerprint):
+            logger.debug("Message text already rejected, skipping")
+            self._record_rejection(RejectReason.REPEATED)
             return None
         
         # Check if should forward
-        should_forward, reason = self.filter.should_forward(original_text)
+        should_forward, reason = self.filter.should_forward(original_text, text_lower)
         
         if not should_forward:
-            logger.info(f"Message rejected: {reason}")
+            logger.info("Message rejected: %s", reason)
+            self._record_rejection(reason)
+            self._recent_fingerprints.add(fingerprint)
             return None
         
         # Clean text
@@ -70,43 +127,38 @@ class MessageProcessor:
         
         if not cleaned_text:
             logger.debug("Message text empty after cleaning, skipping")
+            self._record_rejection(RejectReason.EMPTY)
+            self._recent_fingerprints.add(fingerprint)
             return None
         
         # AI Analysis
-        analysis = await self.ai.analyze_content(cleaned_text)
+        if self._ai_enabled:
+            analysis = await self.ai.analyze_content(cleaned_text)
+        else:
+            analysis = self.ai.fallback_analysis(cleaned_text)
         
         tags = analysis.get("tags", "")
         summary = analysis.get("summary")
         reliability = analysis.get("reliability")
         
-        # Build Footer
-        footer_parts = []
-        
-        ai_metrics = []
-        if reliability is not None:
-            try:
-                score = int(reliability)
-                icon = "🟢" if score >= 8 else "🟡" if score >= 5 else "🔴"
-                ai_metrics.append(f"Patikimumas: {icon} {score}/10")
-            except: pass
-            
-        if ai_metrics:
-            footer_parts.append(f"🤖 {' | '.join(ai_metrics)}")
-            
-        footer_text = "\n".join(footer_parts)
-        
-        # Combine text, footer and tags
-        final_text = f"{cleaned_text}\n\n{footer_text}\n\n{tags}"
-        
-        # Check length and truncate if needed
-        if len(final_text) > MAX_CAPTION_LENGTH:
-            # Simple truncation logic to keep footer
-            available = MAX_CAPTION_LENGTH - len(footer_text) - len(tags) - 20
-            if available > 100:
-                cleaned_text = truncate_text(cleaned_text, available)
-                final_text = f"{cleaned_text}\n\n{footer_text}\n\n{tags}"
-            else:
-                final_text = truncate_text(cleaned_text, MAX_CAPTION_LENGTH)
+        # Build Footer (AIService reports reliability as an int or None)
+        if isinstance(reliability, int) and 0 <= reliability <= 10:
+            footer_text = _RELIABILITY_FOOTERS[reliability]
+        else:
+            footer_text = ""
+        
+        # Room left for the text next to footer, tags and two separators
+        # (Telegram counts the caption limit in UTF-16 code units)
+        budget = MAX_CAPTION_LENGTH - utf16_len(footer_text) - utf16_len(tags) - 4
+        
+        if budget <= 100 and utf16_len(cleaned_text) > budget:
+            # Too little room to keep footer and tags
+            final_text = truncate_text(cleaned_text, MAX_CAPTION_LENGTH)
+        else:
+            # Truncate first (no-op when it fits), then build the caption once,
+            # leaving out an empty footer or tags instead of a blank paragraph
+            cleaned_text = truncate_text(cleaned_text, budget)
+            final_text = "\n\n".join(filter(None, (cleaned_text, footer_text, tags)))
         
         return {
             'original_text': original_text,
@@ -120,36 +172,54 @@ class MessageProcessor:
             'reason': reason
         }
     
-    async def download_media(self, message: Message) -> Optional[str]:
+    async def download_media(self, message: Message) -> Optional[Union[io.BytesIO, str]]:
         """
         Download media from message
         
+        Small files are kept in memory; anything larger than
+        MAX_IN_MEMORY_MEDIA_SIZE (or of unknown size) goes to a file, which
+        the caller removes with cleanup_media_file().
+        
         Args:
             message: Telegram message
         
         Returns:
-            Path to downloaded file or None
+            Named in-memory buffer or path to downloaded file, or None
         """
         if not message.media:
             return None
         
         try:
-            file_path = await message.download_media()
-            return file_path
+            size = message.file and message.file.size
+            if not size or size > MAX_IN_MEMORY_MEDIA_SIZE:
+                return await message.download_media()
+            
+            buffer = io.BytesIO()
+            await message.download_media(file=buffer)
+            
+            # Telethon infers the media type from the file name on upload
+            file = message.file
+            buffer.name = (file and file.name) or f"media{(file and file.ext) or ''}"
+            buffer.seek(0)
+            return buffer
         except Exception as e:
             logger.error(f"Failed to download media: {e}")
             return None
     
-    def cleanup_media_file(self, file_path: str) -> None:
+    def cleanup_media_file(self, media: Optional[Union[io.BytesIO, str]]) -> None:
         """
-        Clean up downloaded media file
+        Clean up media returned by download_media
         
         Args:
-            file_path: Path to file
+            media: In-memory buffer (nothing to remove) or path to file
         """
-        if file_path and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.debug(f"Cleaned up media file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup media file {file_path}: {e}")
+        if not isinstance(media, str):
+            return
+        
+        try:
+            os.remove(media)
+            logger.debug(f"Cleaned up media file: {media}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to cleanup media file {media}: {e}")
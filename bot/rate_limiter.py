@@ -4,16 +4,17 @@ Rate limiting to prevent Telegram API abuse
 
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from collections import deque
-from typing import Optional
+import time
 
 logger = logging.getLogger(__name__)
 
 
 class RateLimiter:
     """
-    Token bucket rate limiter with exponential backoff
+    Token bucket rate limiter with per-minute and per-hour buckets
+    
+    Buckets are refilled lazily from the monotonic clock on each acquire,
+    so the common path is a clock read and a few float operations.
     """
     
     def __init__(
@@ -34,85 +35,62 @@ class RateLimiter:
         self.max_per_hour = max_per_hour
         self.burst_size = burst_size
         
-        self.minute_timestamps = deque(maxlen=max_per_minute)
-        self.hour_timestamps = deque(maxlen=max_per_hour)
+        # Refill rates in tokens per second
+        self.minute_rate = max_per_minute / 60
+        self.hour_rate = max_per_hour / 3600
+        
+        self.tokens_minute = float(max_per_minute)
+        self.tokens_hour = float(max_per_hour)
+        self.last_refill = time.monotonic()
         
         self.consecutive_waits = 0
-        self.last_wait_time = 0
+        
+        # Monotonic deadline of the current FloodWait (0.0 when none), shared
+        # by every caller so concurrent FloodWaits wait once, not side by side
+        self.flood_wait_until = 0.0
         
         logger.info(
             f"Rate limiter initialized: {max_per_minute}/min, {max_per_hour}/hour, "
             f"burst={burst_size}"
         )
     
+    def _refill(self) -> None:
+        """Add tokens accrued since the last refill"""
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        
+        self.tokens_minute = min(self.max_per_minute, self.tokens_minute + elapsed * self.minute_rate)
+        self.tokens_hour = min(self.max_per_hour, self.tokens_hour + elapsed * self.hour_rate)
+    
     async def acquire(self) -> None:
         """
         Acquire permission to make a request
         Will wait if rate limit is exceeded
         """
-        now = datetime.now()
-        
-        # Clean old timestamps
-        self._clean_old_timestamps(now)
-        
-        # Check minute limit
-        if len(self.minute_timestamps) >= self.max_per_minute:
-            wait_time = self._calculate_wait_time(self.minute_timestamps, 60)
-            logger.warning(f"Rate limit (minute): waiting {wait_time:.1f}s")
-            await asyncio.sleep(wait_time)
-            self.consecutive_waits += 1
-        
-        # Check hour limit
-        elif len(self.hour_timestamps) >= self.max_per_hour:
-            wait_time = self._calculate_wait_time(self.hour_timestamps, 3600)
-            logger.warning(f"Rate limit (hour): waiting {wait_time:.1f}s")
-            await asyncio.sleep(wait_time)
-            self.consecutive_waits += 1
-        
-        else:
-            # No wait needed, reset consecutive waits
-            self.consecutive_waits = 0
+        # Hold all sends while a FloodWait is in effect
+        if self.flood_wait_until:
+            await self._wait_out_flood()
         
-        # Record timestamp
-        now = datetime.now()
-        self.minute_timestamps.append(now)
-        self.hour_timestamps.append(now)
-    
-    def _clean_old_timestamps(self, now: datetime) -> None:
-        """Remove timestamps older than their respective windows"""
-        # Clean minute window
-        while self.minute_timestamps and (now - self.minute_timestamps[0]) > timedelta(seconds=60):
-            self.minute_timestamps.popleft()
-        
-        # Clean hour window
-        while self.hour_timestamps and (now - self.hour_timestamps[0]) > timedelta(seconds=3600):
-            self.hour_timestamps.popleft()
-    
-    def _calculate_wait_time(self, timestamps: deque, window_seconds: int) -> float:
-        """
-        Calculate how long to wait before next request
+        self._refill()
         
-        Args:
-            timestamps: Deque of timestamps
-            window_seconds: Time window in seconds
-        
-        Returns:
-            Wait time in seconds
-        """
-        if not timestamps:
-            return 0
+        # Take the token up front; a negative balance reserves a future
+        # slot, so concurrent callers queue up instead of racing on wake-up
+        self.tokens_minute -= 1
+        self.tokens_hour -= 1
         
-        oldest = timestamps[0]
-        elapsed = (datetime.now() - oldest).total_seconds()
-        wait_time = window_seconds - elapsed + 1  # +1 for safety margin
+        if self.tokens_minute >= 0 and self.tokens_hour >= 0:
+            self.consecutive_waits = 0
+            return
         
-        # Apply exponential backoff if consecutive waits
-        if self.consecutive_waits > 0:
-            backoff_multiplier = min(2 ** self.consecutive_waits, 8)  # Max 8x
-            wait_time *= backoff_multiplier
-            logger.debug(f"Exponential backoff: {backoff_multiplier}x")
+        wait_minute = -self.tokens_minute / self.minute_rate
+        wait_hour = -self.tokens_hour / self.hour_rate
+        window = "minute" if wait_minute >= wait_hour else "hour"
+        wait_time = max(wait_minute, wait_hour)
         
-        return max(wait_time, 0)
+        logger.warning(f"Rate limit ({window}): waiting {wait_time:.1f}s")
+        self.consecutive_waits += 1
+        await asyncio.sleep(wait_time)
     
     async def handle_flood_wait(self, wait_seconds: int) -> None:
         """
@@ -123,18 +101,29 @@ class RateLimiter:
         """
         logger.warning(f"FloodWaitError: waiting {wait_seconds}s as requested by Telegram")
         
-        # Add some buffer time
-        wait_with_buffer = wait_seconds + 5
+        # Add some buffer time; a FloodWait already in effect is only extended
+        self.flood_wait_until = max(self.flood_wait_until, time.monotonic() + wait_seconds + 5)
+        
+        await self._wait_out_flood()
         
-        await asyncio.sleep(wait_with_buffer)
+        # Concurrent callers share the deadline; the first one awake resets
+        if not self.flood_wait_until:
+            return
+        self.flood_wait_until = 0.0
         
         # Reset rate limiter state
-        self.minute_timestamps.clear()
-        self.hour_timestamps.clear()
+        self.tokens_minute = float(self.max_per_minute)
+        self.tokens_hour = float(self.max_per_hour)
+        self.last_refill = time.monotonic()
         self.consecutive_waits = 0
         
         logger.info("FloodWait completed, rate limiter reset")
     
+    async def _wait_out_flood(self) -> None:
+        """Sleep until the FloodWait deadline, following any extension"""
+        while (delay := self.flood_wait_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+    
     def get_stats(self) -> dict:
         """
         Get current rate limiter statistics
@@ -142,12 +131,11 @@ class RateLimiter:
         Returns:
             Dictionary with stats
         """
-        now = datetime.now()
-        self._clean_old_timestamps(now)
+        self._refill()
         
         return {
-            'requests_last_minute': len(self.minute_timestamps),
-            'requests_last_hour': len(self.hour_timestamps),
+            'requests_last_minute': int(self.max_per_minute - self.tokens_minute),
+            'requests_last_hour': int(self.max_per_hour - self.tokens_hour),
             'max_per_minute': self.max_per_minute,
             'max_per_hour': self.max_per_hour,
             'consecutive_waits': self.consecutive_waits,
@@ -3,13 +3,44 @@ Database storage layer for persistent state management
 """
 
 import aiosqlite
+import asyncio
 import logging
+from collections import deque
 from datetime import datetime, date
+from itertools import islice
 from typing import Optional, Set
 from pathlib import Path
 
+from bot.db import SQLITE_PRAGMAS
+from bot.utils import BloomFilter
+
 logger = logging.getLogger(__name__)
 
+# Number of recent message texts kept in memory for deduplication
+RECENT_MESSAGES_CACHE = 100
+
+# Initial capacity and false-positive rate of the forwarded-ID bloom filter
+BLOOM_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 1e-4
+
+# Rows fetched per round trip while streaming IDs into the bloom filter
+BLOOM_LOAD_BATCH = 10_000
+
+# Hot-path statements, kept as constants so SQLite's statement cache sees identical text
+_SQL_IS_FORWARDED = "SELECT 1 FROM forwarded_messages WHERE message_id = ? LIMIT 1"
+_SQL_INSERT_FORWARDED = """
+    INSERT OR IGNORE INTO forwarded_messages (message_id, source_channel, message_text)
+    VALUES (?, ?, ?)
+"""
+_SQL_BUMP_POST_COUNT = """
+    INSERT INTO daily_stats (date, posts_count)
+    VALUES (?, 1)
+    ON CONFLICT(date) DO UPDATE SET
+        posts_count = posts_count + 1,
+        updated_at = CURRENT_TIMESTAMP
+"""
+_SQL_READ_POST_COUNT = "SELECT posts_count FROM daily_stats WHERE date = ?"
+
 
 class Storage:
     """
@@ -19,6 +50,16 @@ class Storage:
     def __init__(self, db_path: str = "bot.db"):
         self.db_path = db_path
         self.db: Optional[aiosqlite.Connection] = None
+        
+        # In-memory views of hot read paths, loaded in initialize()
+        self._forwarded_bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+        self._recent_texts: deque = deque(maxlen=RECENT_MESSAGES_CACHE)
+        self._today: Optional[str] = None
+        self._today_count = 0
+        
+        # Held from a transaction's first write to its commit, so another
+        # coroutine's commit cannot persist half of it
+        self._write_lock = asyncio.Lock()
     
     async def initialize(self) -> None:
         """
@@ -32,11 +73,22 @@ class Storage:
         self.db = await aiosqlite.connect(self.db_path)
         self.db.row_factory = aiosqlite.Row
         
+        await self._configure_connection()
         await self._create_tables()
         await self._run_migrations()
+        await self._load_cache()
         
         logger.info("Database initialized successfully")
     
+    async def _configure_connection(self) -> None:
+        """Apply the same WAL and PRAGMA tuning as the shared sync connections"""
+        # In-memory databases have no journal file to switch
+        if self.db_path != ":memory:":
+            await self.db.execute("PRAGMA journal_mode=WAL")
+        
+        for pragma in SQLITE_PRAGMAS:
+            await self.db.execute(pragma)
+    
     async def _create_tables(self) -> None:
         """Create database tables if they don't exist"""
         await self.db.execute("""
@@ -100,6 +152,57 @@ class Storage:
         
         await self.db.commit()
     
+    async def _load_cache(self) -> None:
+        """Load forwarded IDs, recent texts and today's count into memory"""
+        await self._load_forwarded_bloom(BLOOM_CAPACITY)
+        
+        cursor = await self.db.execute(
+            """
+            SELECT message_text FROM forwarded_messages
+            WHERE message_text IS NOT NULL
+            ORDER BY forwarded_at DESC
+            LIMIT ?
+            """,
+            (RECENT_MESSAGES_CACHE,)
+        )
+        self._recent_texts.clear()
+        self._recent_texts.extend(row['message_text'] for row in await cursor.fetchall())
+        
+        self._today = date.today().isoformat()
+        self._today_count = await self._read_post_count(self._today)
+    
+    async def _load_forwarded_bloom(self, capacity: int) -> None:
+        """
+        Build the forwarded-ID bloom filter from the database
+        
+        Args:
+            capacity: Minimum number of IDs the filter is sized for
+        """
+        cursor = await self.db.execute("SELECT COUNT(*) FROM forwarded_messages")
+        total = (await cursor.fetchone())[0]
+        
+        bloom = BloomFilter(max(capacity, total * 2), BLOOM_ERROR_RATE)
+        # Stream in batches rather than materializing every row at once
+        cursor = await self.db.execute("SELECT message_id FROM forwarded_messages")
+        while rows := await cursor.fetchmany(BLOOM_LOAD_BATCH):
+            for row in rows:
+                bloom.add(row['message_id'])
+        
+        self._forwarded_bloom = bloom
+        logger.info(f"Loaded {total} forwarded message IDs into bloom filter (capacity {bloom.capacity})")
+    
+    async def _read_post_count(self, day: str) -> int:
+        """Read post count for a day from the database"""
+        cursor = await self.db.execute(_SQL_READ_POST_COUNT, (day,))
+        row = await cursor.fetchone()
+        
+        return row['posts_count'] if row else 0
+    
+    async def ping(self) -> None:
+        """Run a trivial query to verify the database connection"""
+        cursor = await self.db.execute("SELECT 1")
+        await cursor.fetchone()
+    
     async def is_message_forwarded(self, message_id: str) -> bool:
         """
         Check if message has already been forwarded
@@ -110,12 +213,70 @@ class Storage:
         Returns:
             True if message was already forwarded
         """
+        # Bloom filter answers most (negative) checks without touching SQLite
+        if message_id not in self._forwarded_bloom:
+            return False
+        
+        cursor = await self.db.execute(_SQL_IS_FORWARDED, (message_id,))
+        return await cursor.fetchone() is not None
+    
+    async def filter_forwarded_ids(self, message_ids: list) -> Set[str]:
+        """
+        Return the subset of message IDs that have already been forwarded
+        
+        Args:
+            message_ids: Message identifiers to check in a single query
+        
+        Returns:
+            Set of IDs found in the forwarded messages table
+        """
+        if not message_ids:
+            return set()
+        
+        placeholders = ",".join("?" * len(message_ids))
+        cursor = await self.db.execute(
+            f"SELECT message_id FROM forwarded_messages WHERE message_id IN ({placeholders})",
+            list(message_ids)
+        )
+        return {row['message_id'] for row in await cursor.fetchall()}
+    
+    async def _insert_forwarded(self, message_id: str, source_channel: str, stored_text: Optional[str]) -> bool:
+        """Insert a forwarded message row without committing; False if it already exists"""
         cursor = await self.db.execute(
-            "SELECT 1 FROM forwarded_messages WHERE message_id = ? LIMIT 1",
-            (message_id,)
+            _SQL_INSERT_FORWARDED,
+            (message_id, source_channel, stored_text)
         )
-        result = await cursor.fetchone()
-        return result is not None
+        
+        # OR IGNORE skips existing rows without raising
+        if cursor.rowcount == 0:
+            logger.debug("Message %s already marked as forwarded", message_id)
+            return False
+        
+        return True
+    
+    async def _remember_forwarded(self, message_id: str, stored_text: Optional[str]) -> None:
+        """Update the in-memory views after a forwarded message was committed"""
+        self._forwarded_bloom.add(message_id)
+        if len(self._forwarded_bloom) > self._forwarded_bloom.capacity:
+            # Grow before the false-positive rate degrades
+            await self._load_forwarded_bloom(self._forwarded_bloom.capacity * 2)
+        
+        if stored_text:
+            self._recent_texts.appendleft(stored_text)
+    
+    async def _bump_post_count(self, today: str) -> None:
+        """Increment a day's post count without committing"""
+        await self.db.execute(_SQL_BUMP_POST_COUNT, (today,))
+    
+    async def _apply_post_count(self, today: str) -> int:
+        """Update the in-memory count after a committed increment"""
+        if today != self._today:
+            self._today = today
+            self._today_count = await self._read_post_count(today)
+        else:
+            self._today_count += 1
+        
+        return self._today_count
     
     async def mark_message_forwarded(
         self,
@@ -131,18 +292,49 @@ class Storage:
             source_channel: Source channel name/ID
             message_text: Optional message text for reference
         """
-        try:
-            await self.db.execute(
-                """
-                INSERT INTO forwarded_messages (message_id, source_channel, message_text)
-                VALUES (?, ?, ?)
-                """,
-                (message_id, source_channel, message_text[:500] if message_text else None)
-            )
+        stored_text = message_text[:500] if message_text else None
+        
+        async with self._write_lock:
+            if not await self._insert_forwarded(message_id, source_channel, stored_text):
+                return
             await self.db.commit()
-        except aiosqlite.IntegrityError:
-            # Message already exists, ignore
-            logger.debug(f"Message {message_id} already marked as forwarded")
+        
+        await self._remember_forwarded(message_id, stored_text)
+    
+    async def record_forward(
+        self,
+        message_id: str,
+        source_channel: str,
+        message_text: Optional[str] = None
+    ) -> int:
+        """
+        Mark message as forwarded and increment today's post count in one transaction
+        
+        Args:
+            message_id: Unique message identifier
+            source_channel: Source channel name/ID
+            message_text: Optional message text for reference
+        
+        Returns:
+            New post count for today
+        """
+        stored_text = message_text[:500] if message_text else None
+        today = date.today().isoformat()
+        
+        async with self._write_lock:
+            try:
+                inserted = await self._insert_forwarded(message_id, source_channel, stored_text)
+                await self._bump_post_count(today)
+                await self.db.commit()
+            except Exception:
+                # Neither write may outlive the other
+                await self.db.rollback()
+                raise
+        
+        if inserted:
+            await self._remember_forwarded(message_id, stored_text)
+        
+        return await self._apply_post_count(today)
     
     async def get_today_post_count(self) -> int:
         """
@@ -153,13 +345,12 @@ class Storage:
         """
         today = date.today().isoformat()
         
-        cursor = await self.db.execute(
-            "SELECT posts_count FROM daily_stats WHERE date = ?",
-            (today,)
-        )
-        row = await cursor.fetchone()
+        # Reload from the database when the day rolls over
+        if today != self._today:
+            self._today = today
+            self._today_count = await self._read_post_count(today)
         
-        return row['posts_count'] if row else 0
+        return self._today_count
     
     async def increment_today_post_count(self) -> int:
         """
@@ -170,20 +361,11 @@ class Storage:
         """
         today = date.today().isoformat()
         
-        # Insert or update
-        await self.db.execute(
-            """
-            INSERT INTO daily_stats (date, posts_count)
-            VALUES (?, 1)
-            ON CONFLICT(date) DO UPDATE SET
-                posts_count = posts_count + 1,
-                updated_at = CURRENT_TIMESTAMP
-            """,
-            (today,)
-        )
-        await self.db.commit()
+        async with self._write_lock:
+            await self._bump_post_count(today)
+            await self.db.commit()
         
-        return await self.get_today_post_count()
+        return await self._apply_post_count(today)
     
     async def reset_daily_counter(self) -> None:
         """
@@ -191,14 +373,15 @@ class Storage:
         """
         today = date.today().isoformat()
         
-        await self.db.execute(
-            """
-            INSERT OR IGNORE INTO daily_stats (date, posts_count)
-            VALUES (?, 0)
-            """,
-            (today,)
-        )
-        await self.db.commit()
+        async with self._write_lock:
+            await self.db.execute(
+                """
+                INSERT OR IGNORE INTO daily_stats (date, posts_count)
+                VALUES (?, 0)
+                """,
+                (today,)
+            )
+            await self.db.commit()
         
         logger.info(f"Daily counter reset for {today}")
     
@@ -212,14 +395,15 @@ class Storage:
         Returns:
             Number of deleted records
         """
-        cursor = await self.db.execute(
-            """
-            DELETE FROM forwarded_messages
-            WHERE forwarded_at < datetime('now', '-' || ? || ' days')
-            """,
-            (days,)
-        )
-        await self.db.commit()
+        async with self._write_lock:
+            cursor = await self.db.execute(
+                """
+                DELETE FROM forwarded_messages
+                WHERE forwarded_at < datetime('now', '-' || ? || ' days')
+                """,
+                (days,)
+            )
+            await self.db.commit()
         
         deleted = cursor.rowcount
         logger.info(f"Cleaned up {deleted} old messages (older than {days} days)")
@@ -236,6 +420,9 @@ class Storage:
         Returns:
             List of message texts
         """
+        if limit <= RECENT_MESSAGES_CACHE:
+            return list(islice(self._recent_texts, limit))
+        
         cursor = await self.db.execute(
             """
             SELECT message_text FROM forwarded_messages
@@ -255,23 +442,21 @@ class Storage:
         Returns:
             Dictionary with stats
         """
-        # Total forwarded messages
-        cursor = await self.db.execute("SELECT COUNT(*) as count FROM forwarded_messages")
-        row = await cursor.fetchone()
-        total_messages = row['count']
-        
-        # Today's count
-        today_count = await self.get_today_post_count()
-        
-        # Messages in last 7 days
+        # Total and last-7-days counts in one table scan
         cursor = await self.db.execute(
             """
-            SELECT COUNT(*) as count FROM forwarded_messages
-            WHERE forwarded_at >= datetime('now', '-7 days')
+            SELECT
+                COUNT(*) as count,
+                COALESCE(SUM(forwarded_at >= datetime('now', '-7 days')), 0) as recent
+            FROM forwarded_messages
             """
         )
         row = await cursor.fetchone()
-        last_7_days = row['count']
+        total_messages = row['count']
+        last_7_days = row['recent']
+        
+        # Today's count
+        today_count = await self.get_today_post_count()
         
         return {
             'total_messages': total_messages,
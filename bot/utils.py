@@ -3,10 +3,18 @@ Shared utilities and constants
 """
 
 import asyncio
+import collections
 import functools
+import hashlib
 import logging
+import math
+import random
+import re
+import threading
+from dataclasses import dataclass
 from typing import Any, Callable, TypeVar, Optional
 from datetime import datetime
+from rapidfuzz.utils import default_process
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +24,46 @@ MAX_MESSAGES_TO_FETCH = 100
 SAFETY_MULTIPLIER = 5
 DEFAULT_RETRY_DELAY = 5
 MAX_RETRIES = 3
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 0.2
+
+# Telegram usernames: ASCII letters, digits and underscores, 5-32 chars
+_CHANNEL_USERNAME_RE = re.compile(r'[A-Za-z0-9_]{5,32}\Z')
 
 T = TypeVar('T')
 
 
+@dataclass(frozen=True, slots=True)
+class NormalizedText:
+    """
+    Message text normalized once and shared by the processing pipeline
+    
+    Attributes:
+        raw: Original text
+        lower: Lowercased text for keyword matching
+        tokens: Lowercased alphanumeric tokens (rapidfuzz default processing)
+        sorted_tokens: Tokens sorted and joined by spaces, used for dedup
+    """
+    raw: str
+    lower: str
+    tokens: tuple
+    sorted_tokens: str
+    
+    @classmethod
+    def from_text(cls, text: str) -> "NormalizedText":
+        """
+        Normalize text
+        
+        Args:
+            text: Original text
+        
+        Returns:
+            NormalizedText instance
+        """
+        tokens = tuple(default_process(text).split())
+        return cls(text, text.lower(), tokens, " ".join(sorted(tokens)))
+
+
 def retry_on_error(
     max_retries: int = MAX_RETRIES,
     delay: int = DEFAULT_RETRY_DELAY,
@@ -28,11 +72,17 @@ def retry_on_error(
     """
     Decorator to retry async functions on error with exponential backoff
     
+    Each wait is jittered to 50-150% of its backoff step, so callers that
+    failed together (e.g. during an outage) do not retry in lockstep.
+    
     Args:
         max_retries: Maximum number of retry attempts
         delay: Initial delay between retries in seconds
         exceptions: Tuple of exceptions to catch
     """
+    # Exponential backoff steps, computed once per decorated function
+    schedule = tuple(delay * (1 << attempt) for attempt in range(max_retries))
+    
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @functools.wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> T:
@@ -44,10 +94,10 @@ def retry_on_error(
                 except exceptions as e:
                     last_exception = e
                     if attempt < max_retries:
-                        wait_time = delay * (2 ** attempt)  # Exponential backoff
+                        wait_time = schedule[attempt] * (0.5 + random.random())
                         logger.warning(
-                            f"Attempt {attempt + 1}/{max_retries} failed for {func.__name__}: {e}. "
-                            f"Retrying in {wait_time}s..."
+                            "Attempt %d/%d failed for %s: %s. Retrying in %.1fs...",
+                            attempt + 1, max_retries, func.__name__, e, wait_time
                         )
                         await asyncio.sleep(wait_time)
                     else:
@@ -59,29 +109,40 @@ def retry_on_error(
     return decorator
 
 
+def utf16_len(text: str) -> int:
+    """Length of text in UTF-16 code units, the unit of Telegram's text limits"""
+    return len(text.encode('utf-16-le')) // 2
+
+
 def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
     """
     Truncate text to max length, preserving word boundaries
     
     Args:
         text: Text to truncate
-        max_length: Maximum length
+        max_length: Maximum length in UTF-16 code units
         suffix: Suffix to add if truncated
     
     Returns:
         Truncated text
     """
-    if len(text) <= max_length:
+    encoded = text.encode('utf-16-le')
+    if len(encoded) <= 2 * max_length:
         return text
     
-    # Try to truncate at word boundary
-    truncated = text[:max_length - len(suffix)]
-    last_space = truncated.rfind(' ')
+    # Cut position in code units, converted to a character index
+    cut = max_length - len(suffix)
+    if len(encoded) != 2 * len(text):
+        # Surrogate pairs present; 'ignore' drops a pair split by the cut
+        cut = len(encoded[:2 * cut].decode('utf-16-le', 'ignore'))
+    
+    # Try to truncate at word boundary (scanned in place, no copy)
+    last_space = text.rfind(' ', 0, cut)
     
     if last_space > max_length * 0.8:  # Only use word boundary if not too short
-        truncated = truncated[:last_space]
+        cut = last_space
     
-    return truncated + suffix
+    return text[:cut] + suffix
 
 
 def format_timestamp(dt: Optional[datetime] = None) -> str:
@@ -129,38 +190,141 @@ def validate_channel_format(channel: str) -> bool:
     if not channel:
         return False
     
-    # Remove @ if present
-    clean = channel.lstrip('@')
-    
-    # Must be alphanumeric + underscores, 5-32 chars
-    if not clean.replace('_', '').isalnum():
-        return False
-    
-    return 5 <= len(clean) <= 32
+    # Leading @ is optional
+    return _CHANNEL_USERNAME_RE.match(channel.lstrip('@')) is not None
 
 
 class CircularBuffer:
     """
     Simple circular buffer for storing recent items
+    
+    Items must be hashable: a count per item kept alongside the deque makes
+    contains() O(1).
     """
     
     def __init__(self, max_size: int = 1000):
         self.max_size = max_size
-        self.items = []
+        self.items = collections.deque(maxlen=max_size)
+        self._counts = collections.Counter()
     
     def add(self, item: Any) -> None:
         """Add item to buffer"""
+        if not self.max_size:
+            return
+        
+        # The deque drops its oldest item on append once full
+        if len(self.items) == self.max_size:
+            evicted = self.items[0]
+            self._counts[evicted] -= 1
+            if not self._counts[evicted]:
+                del self._counts[evicted]
         self.items.append(item)
-        if len(self.items) > self.max_size:
-            self.items.pop(0)
+        self._counts[item] += 1
     
     def contains(self, item: Any) -> bool:
         """Check if item is in buffer"""
-        return item in self.items
+        return item in self._counts
     
     def clear(self) -> None:
         """Clear buffer"""
         self.items.clear()
+        self._counts.clear()
     
     def __len__(self) -> int:
         return len(self.items)
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter for fast negative membership checks
+    
+    False positives are possible at roughly the configured error rate;
+    false negatives are not.
+    """
+    
+    __slots__ = ('capacity', 'num_bits', 'num_hashes', 'bits', 'count')
+    
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: str):
+        """Yield bit positions for item using double hashing"""
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % num_bits
+    
+    def add(self, item: str) -> None:
+        """Add item to filter"""
+        bits = self.bits
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+    
+    def __len__(self) -> int:
+        return self.count
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that batches writes instead of flushing after every record
+    
+    Records go into a large file buffer that is flushed when full, every
+    flush_interval seconds by a background thread, and on close.
+    """
+    
+    def __init__(
+        self,
+        filename: str,
+        encoding: Optional[str] = None,
+        buffer_size: int = LOG_BUFFER_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL
+    ):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        super().__init__(filename, encoding=encoding)
+        
+        self._stop_event = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+        self._flusher.start()
+    
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=self.errors
+        )
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write record to the buffer without flushing"""
+        try:
+            msg = self.format(record)
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(msg + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def _flush_loop(self) -> None:
+        """Periodically flush buffered records"""
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+    
+    def close(self) -> None:
+        """Stop the flusher and flush remaining records"""
+        self._stop_event.set()
+        super().close()
@@ -9,11 +9,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from telethon.sessions import StringSession
 from telethon import TelegramClient
-from bot.config import Config
+from bot.config import get_config
 
 async def generate():
     try:
-        config = Config.from_env()
+        config = get_config()
     except Exception as e:
         print(f"Error loading config: {e}")
         return